@@ -1,16 +1,19 @@
-import os
+import sys
+from pathlib import Path
 from typing import List, Dict, Any
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Embedding calls go through the same governor (concurrency cap, retries, circuit breaker) as serving
+sys.path.insert(0, str(Path(__file__).parent.parent / "workflow"))
+
+from utils.embeddings import create_embeddings_model
+
 def create_embeddings_for_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
-    embeddings_model = OpenAIEmbeddings(
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-        model="text-embedding-ada-002"  
-    )
+    # Same model (settings.EMBEDDING_MODEL) that embeds queries at serving time
+    embeddings_model = create_embeddings_model()
     
     embedded_chunks = []
     print(f"Creating embeddings for {len(chunks)} chunks...")
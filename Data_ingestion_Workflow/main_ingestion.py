@@ -1,14 +1,26 @@
 import os
 import time
-from typing import Dict, Any
+import hashlib
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 from pdf_extractor import extract_pdfs_from_documents_folder
 from metadata_enrichment import enrich_document_metadata
 from chunking import chunk_documents 
 from embedding import create_embeddings_for_chunks, prepare_chunks_for_vector_db, validate_embeddings
-from pinecone_storage import store_chunks_in_pinecone
+from vector_storage import store_chunks_in_vector_store
+from sparse_indexing import store_sparse_index
 load_dotenv()
 
+
+def compute_corpus_version(vector_db_chunks: List[Dict[str, Any]]) -> str:
+    """Content hash shared by the dense and sparse indexes built from the same chunks."""
+    digest = hashlib.sha256()
+    for chunk in sorted(vector_db_chunks, key=lambda chunk: chunk["id"]):
+        digest.update(chunk["id"].encode("utf-8"))
+        digest.update(chunk["content"].encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
 def run_complete_ingestion_pipeline() -> Dict[str, Any]:
 
     print("=" * 80)
@@ -36,11 +48,18 @@ def run_complete_ingestion_pipeline() -> Dict[str, Any]:
     embedded_chunks = create_embeddings_for_chunks(chunks)
     embedding_validation = validate_embeddings(embedded_chunks)
     vector_db_chunks = prepare_chunks_for_vector_db(embedded_chunks)
+    corpus_version = compute_corpus_version(vector_db_chunks)
+    print(f"Corpus version: {corpus_version}")
+    
+    print("\n💾 STEP 5: VECTOR STORAGE")
+    print("-" * 40)
+
+    store_chunks_in_vector_store(vector_db_chunks, corpus_version)
     
-    print("\n💾 STEP 5: PINECONE STORAGE")
+    print("\n📝 STEP 6: SPARSE INDEX")
     print("-" * 40)
 
-    store_chunks_in_pinecone(vector_db_chunks)
+    store_sparse_index(vector_db_chunks, corpus_version)
     
     print("\n✅ PIPELINE COMPLETED SUCCESSFULLY!")
     print("=" * 80)
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+from typing import List, Dict, Any
+
+# The sparse index format is shared with the serving code in workflow/
+sys.path.insert(0, str(Path(__file__).parent.parent / "workflow"))
+
+from utils.sparse_index import build_sparse_index, write_sparse_index, SPARSE_INDEX_PATH
+
+
+def store_sparse_index(vector_db_chunks: List[Dict[str, Any]], corpus_version: str) -> bool:
+
+    print(f"Building sparse index for {len(vector_db_chunks)} chunks...")
+
+    artifact = build_sparse_index(vector_db_chunks, corpus_version)
+    write_sparse_index(artifact)
+
+    print(f"✅ Sparse index {corpus_version} written to {SPARSE_INDEX_PATH}: "
+          f"{len(artifact['corpus_docs'])} documents, {artifact['tfidf_matrix'].shape[1]} features")
+    return True
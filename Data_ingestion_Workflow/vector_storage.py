@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+from typing import List, Dict, Any
+from dotenv import load_dotenv
+load_dotenv()
+
+# The vector store implementation is shared with the serving code in workflow/
+sys.path.insert(0, str(Path(__file__).parent.parent / "workflow"))
+
+from utils.vector_store import get_vector_store
+from settings import VECTOR_STORE_BACKEND
+
+
+def store_chunks_in_vector_store(vector_db_chunks: List[Dict[str, Any]], corpus_version: str) -> bool:
+
+    print(f"Storing {len(vector_db_chunks)} chunks in {VECTOR_STORE_BACKEND} vector store...")
+
+    vectors = []
+    for chunk in vector_db_chunks:
+        metadata = chunk["metadata"]
+
+        allowed_roles = metadata.get("allowed_roles", ["employee"])
+        if isinstance(allowed_roles, list):
+            allowed_roles = ",".join(allowed_roles)
+
+        vectors.append({
+            "id": chunk["id"],
+            "values": chunk["embedding"],
+            "metadata": {
+                "content": chunk["content"],
+                "chunk_id": chunk["id"],
+                "corpus_version": corpus_version,
+                "source": metadata.get("source", ""),
+                "page": metadata.get("page", 0),
+                "access_level": metadata.get("access_level", "public"),
+                "allowed_roles": allowed_roles,
+                "document_type": metadata.get("document_type", ""),
+                "department": metadata.get("department", ""),
+                "chunk_index": metadata.get("chunk_index", 0),
+                "chunk_size": metadata.get("chunk_size", 0),
+                "total_chunks": metadata.get("total_chunks", 0)
+            }
+        })
+
+    get_vector_store().replace_all(vectors, version=corpus_version)
+
+    print(f"✅ Successfully stored {len(vectors)} chunks with access control")
+    return True
@@ -1,12 +1,52 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from typing import Dict, Any
+import asyncio
+import json
+import time
 import uvicorn
 import os
-from graph import run_workflow
+from graph import arun_workflow, astream_workflow, warm_up, single_flight_stats
+from utils import metrics
+from utils.embeddings import query_cache_stats
+from utils.answer_cache import answer_cache_stats
+from utils.llm_clients import llm_client_stats
+from utils.llm_cache import llm_cache_stats
+from utils.governor import governor_stats
+from utils.sparse_index import aget_corpus_version
+from utils.instrumentation import request_trace
+from utils.log import get_logger, request_context
+from settings import REQUEST_TRACE_ENABLED
 
-app = FastAPI(title="RAG Workflow API", version="1.0.0")
+logger = get_logger(__name__)
+
+
+# Reported by /api/ready; traffic should only be routed here once warm-up finished and the
+# sparse index is loaded (without it hybrid retrieval silently degrades to dense-only)
+readiness = {"ready": False, "warm_up": None, "error": None}
+
+
+async def run_warm_up():
+    try:
+        readiness["warm_up"] = await asyncio.to_thread(warm_up)
+        readiness["ready"] = True
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.exception("Warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the server can answer health checks meanwhile
+    warm_up_task = asyncio.create_task(run_warm_up())
+    yield
+    warm_up_task.cancel()
+
+
+app = FastAPI(title="RAG Workflow API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,9 +61,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # Every log record of the request carries this ID; a sane incoming X-Request-ID is reused
+    with request_context(request.headers.get("x-request-id")) as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 class WorkflowRequest(BaseModel):
     query: str
     user_id: str
+    # Attach a per-request trace to the response; honoured only when REQUEST_TRACE_ENABLED
+    debug: bool = False
 
 class WorkflowResponse(BaseModel):
     success: bool
@@ -33,22 +83,75 @@ class WorkflowResponse(BaseModel):
 @app.post("/api/workflow", response_model=WorkflowResponse)
 async def process_workflow(request: WorkflowRequest):
    
+    start = time.perf_counter()
     try:
-        print(f"Received request - Query: {request.query}, User ID: {request.user_id}")
+        # Queries can contain personal details, so only their size is logged
+        logger.info("Workflow request", extra={"user_id": request.user_id, "query_chars": len(request.query)})
         
-        result = run_workflow(request.query, request.user_id)
+        # Awaited end to end, so one worker keeps serving other requests meanwhile
+        if request.debug and REQUEST_TRACE_ENABLED:
+            with request_trace() as trace:
+                result = await arun_workflow(request.query, request.user_id)
+            # A new dict, so a cached response is never modified
+            result = {**result, "trace": trace.to_dict()}
+        else:
+            result = await arun_workflow(request.query, request.user_id)
         
+        logger.info("Workflow completed", extra={"status": result.get("status"), "seconds": round(time.perf_counter() - start, 3)})
         return WorkflowResponse(
             success=True,
             data=result
         )
     except Exception as e:
-        print(f"Error processing workflow: {str(e)}")
+        logger.exception("Workflow failed")
         return WorkflowResponse(
             success=False,
             error=str(e)
         )
 
+async def sse_events(query: str, user_id: str):
+    try:
+        async for event, data in astream_workflow(query, user_id):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    except Exception as e:
+        logger.exception("Workflow stream failed")
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+
+@app.post("/api/workflow/stream")
+async def stream_workflow_events(request: WorkflowRequest):
+    return StreamingResponse(
+        sse_events(request.query, request.user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/ready")
+async def get_readiness():
+    # Checked on every probe: the index hot-reloads once ingestion writes it
+    sparse_index_loaded = await aget_corpus_version() != "none"
+    status = {**readiness, "ready": readiness["ready"] and sparse_index_loaded, "sparse_index_loaded": sparse_index_loaded}
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    return {
+        **metrics.snapshot(),
+        "embedding_cache": query_cache_stats(),
+        "answer_cache": answer_cache_stats(),
+        "llm_clients": llm_client_stats(),
+        "llm_cache": llm_cache_stats(),
+        "single_flight": single_flight_stats(),
+        "governor": governor_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    # Node latency histograms, LLM call/token/retry counters and route decisions, for Prometheus to scrape
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     
     uvicorn.run("api_server:app", host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
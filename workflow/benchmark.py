@@ -0,0 +1,111 @@
+"""
+Throughput of the blocking and async request paths at several concurrency levels.
+
+    python benchmark.py --concurrency 1 10 100
+
+"blocking" reproduces the old endpoint, an async handler calling run_workflow directly,
+so in-flight requests queue behind each other on the event loop. "async" awaits
+arun_workflow, which is what /api/workflow does now. The answer cache and single-flight
+coalescing are disabled so every request runs the full graph; the queries repeat, so
+with either on the async numbers would mostly measure deduplication. log_us/req is the
+time request threads spent handing log records to the background writer, per request.
+
+To run without OpenAI or Pinecone, ingest and benchmark against the offline stand-ins:
+
+    LLM_PROVIDER=fake VECTOR_STORE_BACKEND=local FAKE_LATENCY_MS=300 python benchmark.py
+"""
+import os
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("SINGLE_FLIGHT_ENABLED", "false")
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Any, List
+import numpy as np
+from graph import run_workflow, arun_workflow, warm_up
+from utils import metrics
+
+BENCHMARK_QUERIES = [
+    ("How many vacation days do employees get per year?", "EMP001"),
+    ("What is the process for requesting parental leave?", "EMP002"),
+    ("How should a manager handle a performance improvement plan?", "MGR001"),
+    ("What are the steps for conducting an internal investigation?", "HR001"),
+    ("Can I work remotely and how do I request it?", "EMP003"),
+]
+
+
+def logging_totals() -> Dict[str, float]:
+    """Cumulative logging cost so far, summed over label sets."""
+    snapshot = metrics.snapshot()
+    return {name: sum(entry["value"] for entry in snapshot.get(name, []))
+            for name in ("log_emit_seconds", "log_records", "log_records_dropped")}
+
+
+async def run_level(mode: str, concurrency: int, total: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        query, user_id = BENCHMARK_QUERIES[i % len(BENCHMARK_QUERIES)]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if mode == "blocking":
+                    run_workflow(query, user_id)
+                else:
+                    await arun_workflow(query, user_id)
+            except Exception as e:
+                errors += 1
+                print(f"❌ Request {i} failed: {e}")
+            latencies.append(time.perf_counter() - start)
+
+    logs_before = logging_totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - start
+    logs = {name: value - logs_before[name] for name, value in logging_totals().items()}
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(total / wall, 2),
+        "p50_seconds": round(float(np.percentile(latencies, 50)), 2),
+        "p95_seconds": round(float(np.percentile(latencies, 95)), 2),
+        "log_records_per_request": round(logs["log_records"] / total, 1),
+        "log_us_per_request": round(logs["log_emit_seconds"] / total * 1e6, 1),
+        "log_records_dropped": int(logs["log_records_dropped"]),
+    }
+
+
+async def main(modes: List[str], levels: List[int], requests: int):
+    # One event loop for the whole run; the shared async HTTP pools are bound to it
+    results = []
+    for concurrency in levels:
+        total = requests or max(10, concurrency * 2)
+        for mode in modes:
+            print(f"\n⏱️ {mode}: {total} requests at concurrency {concurrency}")
+            results.append(await run_level(mode, concurrency, total))
+
+    print("\nmode      concurrency  requests  errors  wall_s  req/s   p50_s  p95_s  logs/req  log_us/req  dropped")
+    for r in results:
+        print(f"{r['mode']:<9} {r['concurrency']:>11} {r['requests']:>9} {r['errors']:>7} "
+              f"{r['wall_seconds']:>7} {r['throughput_rps']:>6} {r['p50_seconds']:>6} {r['p95_seconds']:>6} "
+              f"{r['log_records_per_request']:>9} {r['log_us_per_request']:>11} {r['log_records_dropped']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the workflow request paths")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--mode", choices=["blocking", "async", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=0, help="requests per level (default: max(10, 2 x concurrency))")
+    args = parser.parse_args()
+
+    warm_up()
+    modes = ["blocking", "async"] if args.mode == "both" else [args.mode]
+    asyncio.run(main(modes, args.concurrency, args.requests))
@@ -0,0 +1,93 @@
+"""
+Calibration report for the document grader fast path.
+
+    python calibrate_grader.py --queries calibration_queries.jsonl --target-precision 0.95
+
+Each line of the query file is {"query", "user_id", "relevant"} where "relevant" says whether
+the corpus can answer the question. Every query runs through authorization and hybrid
+retrieval (no LLM calls). The report shows how often the fast path would fire and how
+precise its "yes" is at the configured thresholds, then sweeps alternatives and suggests
+the widest-coverage one that meets the target precision.
+"""
+import argparse
+import json
+from typing import Dict, Any, List
+from settings import GRADER_FAST_PATH_MIN_SCORE, GRADER_FAST_PATH_MIN_AGREEMENT
+from nodes.authorization import authorization_node
+from nodes.retrieval_pinecone import document_retriever_node
+from nodes.grading import fast_path_signals
+
+
+def collect_signals(examples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for example in examples:
+        state = {"query": example["query"], "user_id": example["user_id"]}
+        state = document_retriever_node(authorization_node(state))
+        rows.append({**fast_path_signals(state["retrieved_chunks"]), "relevant": bool(example["relevant"]), "query": example["query"]})
+    return rows
+
+
+def evaluate(rows: List[Dict[str, Any]], min_score: float, min_agreement: int) -> Dict[str, Any]:
+    fast = [row for row in rows if row["top_score"] >= min_score and row["agreement"] >= min_agreement]
+    correct = sum(row["relevant"] for row in fast)
+    return {
+        "min_score": round(min_score, 4),
+        "min_agreement": min_agreement,
+        "fast_path": len(fast),
+        "coverage": round(len(fast) / len(rows), 4) if rows else 0.0,
+        "precision": round(correct / len(fast), 4) if fast else None,
+        "false_positives": len(fast) - correct,
+    }
+
+
+def sweep(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Every observed top score is a candidate threshold
+    scores = sorted({row["top_score"] for row in rows})
+    max_agreement = max((row["agreement"] for row in rows), default=0)
+    return [evaluate(rows, score, agreement) for agreement in range(max_agreement + 1) for score in scores]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the document grader fast path")
+    parser.add_argument("--queries", default="calibration_queries.jsonl")
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    print(f"📋 Collecting retrieval signals for {len(examples)} labelled queries...")
+    rows = collect_signals(examples)
+
+    configured = evaluate(rows, GRADER_FAST_PATH_MIN_SCORE, GRADER_FAST_PATH_MIN_AGREEMENT)
+    candidates = [
+        result for result in sweep(rows)
+        if result["precision"] is not None and result["precision"] >= args.target_precision
+    ]
+    recommended = max(candidates, key=lambda result: (result["coverage"], -result["min_score"]), default=None)
+
+    print("\nquery                                                          relevant  top_score  agreement")
+    for row in rows:
+        print(f"{row['query'][:62]:<62} {str(row['relevant']):>8} {row['top_score']:>10.4f} {row['agreement']:>10}")
+
+    print(f"\nConfigured thresholds (min_score={GRADER_FAST_PATH_MIN_SCORE}, min_agreement={GRADER_FAST_PATH_MIN_AGREEMENT}):")
+    print(f"  fast path on {configured['fast_path']}/{len(rows)} queries (coverage {configured['coverage']:.1%}), "
+          f"precision {configured['precision'] if configured['precision'] is not None else 'n/a'}, "
+          f"{configured['false_positives']} false positives")
+
+    if recommended:
+        print(f"\nRecommended for precision >= {args.target_precision}: GRADER_FAST_PATH_MIN_SCORE={recommended['min_score']} "
+              f"GRADER_FAST_PATH_MIN_AGREEMENT={recommended['min_agreement']} "
+              f"(coverage {recommended['coverage']:.1%}, precision {recommended['precision']})")
+    else:
+        print(f"\nNo threshold reaches precision {args.target_precision} on this query set")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"configured": configured, "recommended": recommended, "queries": rows}, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,109 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from state import WorkflowState
 from conditional_edges import (
     check_document_relevance,
-    check_hallucination, check_answer_relevance, check_escalation_needed
+    check_validation, check_escalation_needed
 )
 from nodes.authorization import user_query_node, authorization_node
-from nodes.retrieval_pinecone import document_retriever_node
-from nodes.grading import grade_document_node, query_enhancer_node
-from nodes.generation import generation_node
-from nodes.validation import hallucination_check_node, relevance_check_node
+from nodes.retrieval_pinecone import document_retriever_node, adocument_retriever_node
+from nodes.grading import grade_document_node, agrade_document_node, query_enhancer_node, aquery_enhancer_node, GRADER_LLM, ENHANCER_LLM
+from nodes.generation import generation_node, ageneration_node, GENERATION_LLM
+from nodes.validation import (
+    hallucination_check_node, ahallucination_check_node,
+    relevance_check_node, arelevance_check_node,
+    fused_verification_node, afused_verification_node,
+    validation_join_node, VALIDATION_LLM
+)
 from nodes.confidence import confidence_score_node
 from nodes.escalation import escalation_check_node, escalation_node
-from utils.helpers import format_final_response
+from utils.helpers import format_final_response, parse_user_role
+from utils.answer_cache import get_cached_answer, cache_answer, aget_cached_answer, acache_answer
+from utils.sparse_index import get_sparse_index
+from utils.vector_store import get_vector_store
+from utils.embeddings import get_embeddings_model, normalize_query
+from utils.single_flight import SingleFlight
+from utils.llm_clients import get_llm
+from utils.context_packer import get_encoding
+from utils.instrumentation import instrument_node, ainstrument_node, instrument_route, annotate
+from utils.log import get_logger
+from settings import VERIFICATION_MODE, SINGLE_FLIGHT_ENABLED
 from datetime import datetime
-from IPython.display import Image, display
+from typing import Dict, Any, Iterator, AsyncIterator, Tuple
+import functools
+import threading
+import time
+
+logger = get_logger(__name__)
+
+# Nodes that discard an answer already streamed to the client, and why
+RETRACTING_NODES = {
+    "generation": "hallucination_detected",
+    "query_enhancer": "answer_not_relevant",
+    "escalation": "escalated"
+}
+
+# Concurrent identical questions from the same role share one execution
+_single_flight = SingleFlight()
+
+# Compiled once per process; see get_workflow_app()
+_workflow_app = None
+_workflow_app_lock = threading.Lock()
+
+
+def graph_node(name: str, func, afunc=None):
+    """
+    A node reporting latency, LLM calls, tokens and retries under name. func runs under
+    invoke/stream; afunc, when given, under ainvoke/astream. Without afunc, func runs
+    directly on the event loop, so nodes without one must not block.
+    """
+    if afunc is None:
+        # RunnableLambda would otherwise hop every sync node through the loop's default executor
+        afunc = inline_async(func)
+    return RunnableLambda(instrument_node(name, func), afunc=ainstrument_node(name, afunc), name=name)
+
+
+def inline_async(func):
+    @functools.wraps(func)
+    async def afunc(state: Dict[str, Any]) -> Dict[str, Any]:
+        return func(state)
+    return afunc
+
+
+def routed(condition):
+    """A conditional edge whose every decision is counted in route_decisions."""
+    return instrument_route(condition.__name__, condition)
+
+
+def set_status(status: str):
+    def node(state: Dict[str, Any]) -> Dict[str, Any]:
+        return {**state, "status": status}
+    return node
 
 
 def create_workflow_graph():
   
     workflow = StateGraph(WorkflowState)
     
-    # Add nodes
-    workflow.add_node("user_query", user_query_node)
-    workflow.add_node("authorization", authorization_node)
-    workflow.add_node("document_retriever", document_retriever_node)
-    workflow.add_node("grade_document", grade_document_node)
-    workflow.add_node("query_enhancer", query_enhancer_node)
-    workflow.add_node("generation", generation_node)
-    workflow.add_node("hallucination_checker", hallucination_check_node)
-    workflow.add_node("relevance_checker", relevance_check_node)
-    workflow.add_node("confidence_calculator", confidence_score_node)
-    workflow.add_node("escalation_check", escalation_check_node)
-    workflow.add_node("escalation", escalation_node)
+    # Add nodes; the ones waiting on the network have async twins for the async request path
+    workflow.add_node("user_query", graph_node("user_query", user_query_node))
+    workflow.add_node("authorization", graph_node("authorization", authorization_node))
+    workflow.add_node("document_retriever", graph_node("document_retriever", document_retriever_node, adocument_retriever_node))
+    workflow.add_node("grade_document", graph_node("grade_document", grade_document_node, agrade_document_node))
+    workflow.add_node("query_enhancer", graph_node("query_enhancer", query_enhancer_node, aquery_enhancer_node))
+    workflow.add_node("generation", graph_node("generation", generation_node, ageneration_node))
+    if VERIFICATION_MODE == "fused":
+        workflow.add_node("verification", graph_node("verification", fused_verification_node, afused_verification_node))
+    else:
+        workflow.add_node("hallucination_checker", graph_node("hallucination_checker", hallucination_check_node, ahallucination_check_node))
+        workflow.add_node("relevance_checker", graph_node("relevance_checker", relevance_check_node, arelevance_check_node))
+        workflow.add_node("validation_join", graph_node("validation_join", validation_join_node))
+    workflow.add_node("confidence_calculator", graph_node("confidence_calculator", confidence_score_node))
+    workflow.add_node("escalation_check", graph_node("escalation_check", escalation_check_node))
+    workflow.add_node("escalation", graph_node("escalation", escalation_node))
     
-    workflow.add_node("irrelevant_query", lambda x: {**x, "status": "irrelevant_query"})
-    workflow.add_node("final_answer", lambda x: {**x, "status": "success"})
+    workflow.add_node("irrelevant_query", graph_node("irrelevant_query", set_status("irrelevant_query")))
+    workflow.add_node("final_answer", graph_node("final_answer", set_status("success")))
     
     workflow.set_entry_point("user_query")
     
@@ -44,7 +113,7 @@ def create_workflow_graph():
     
     workflow.add_conditional_edges(
         "grade_document",
-        check_document_relevance,
+        routed(check_document_relevance),
         {
             "generate_answer": "generation",
             "enhance_query": "query_enhancer",
@@ -54,21 +123,21 @@ def create_workflow_graph():
     
     workflow.add_edge("query_enhancer", "document_retriever")
     
-    workflow.add_conditional_edges(
-        "hallucination_checker",
-        check_hallucination,
-        {
-            "check_relevance": "relevance_checker",
-            "regenerate_answer": "generation"
-        }
-    )
-    
-    workflow.add_edge("generation", "hallucination_checker")
+    if VERIFICATION_MODE == "fused":
+        workflow.add_edge("generation", "verification")
+        validation_node = "verification"
+    else:
+        # Both answer checks only need the generated answer, so they run concurrently
+        workflow.add_edge("generation", "hallucination_checker")
+        workflow.add_edge("generation", "relevance_checker")
+        workflow.add_edge(["hallucination_checker", "relevance_checker"], "validation_join")
+        validation_node = "validation_join"
     
     workflow.add_conditional_edges(
-        "relevance_checker",
-        check_answer_relevance,
+        validation_node,
+        routed(check_validation),
         {
+            "regenerate_answer": "generation",
             "calculate_confidence": "confidence_calculator",
             "enhance_query": "query_enhancer"
         }
@@ -78,7 +147,7 @@ def create_workflow_graph():
     
     workflow.add_conditional_edges(
         "escalation_check",
-        check_escalation_needed,
+        routed(check_escalation_needed),
         {
             "escalate": "escalation",
             "final_answer": "final_answer"
@@ -91,25 +160,176 @@ def create_workflow_graph():
     
     return workflow.compile()
 
-def run_workflow(query: str, user_id: str):
 
-    app = create_workflow_graph()
-   
-    # png_data = app.get_graph().draw_mermaid_png()
-    # with open('graph_diagram.png', 'wb') as f:
-    #     f.write(png_data)
-    
-    initial_state = {
+def get_workflow_app():
+    """The compiled workflow graph, built on first use and shared by all requests."""
+    global _workflow_app
+
+    if _workflow_app is None:
+        with _workflow_app_lock:
+            if _workflow_app is None:
+                start = time.perf_counter()
+                _workflow_app = create_workflow_graph()
+                logger.info("Compiled workflow graph in %.0fms", (time.perf_counter() - start) * 1000)
+    return _workflow_app
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Build everything the first request would otherwise pay for: the compiled graph,
+    the sparse index, the LLM and embedding clients, the tokenizer and the vector store handle.
+    Returns the time each step took, in seconds.
+    """
+    steps = {
+        "graph": get_workflow_app,
+        "sparse_index": get_sparse_index,
+        "llm_clients": lambda: [get_llm(*config) for config in (GRADER_LLM, ENHANCER_LLM, GENERATION_LLM, VALIDATION_LLM)],
+        "embeddings": get_embeddings_model,
+        "tokenizer": get_encoding,
+        "vector_store": lambda: get_vector_store().warm_up(),
+    }
+
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - start, 4)
+
+    logger.info("Warm-up complete", extra={"timings": timings})
+    return timings
+
+
+def initial_workflow_state(query: str, user_id: str) -> Dict[str, Any]:
+    return {
         "query": query,
         "user_id": user_id,
         "timestamp": datetime.now(),
         "retry_count": 0,
         "generation_retry_count": 0
     }
+
+
+def run_workflow(query: str, user_id: str):
+
+    # Near-duplicate questions from the same role reuse an earlier successful answer
+    user_role = parse_user_role(user_id)
+    cached_response = get_cached_answer(query, user_role)
+    if cached_response is not None:
+        annotate("answer_cache", "hit")
+        return cached_response
+
+    if not SINGLE_FLIGHT_ENABLED:
+        return execute_workflow(query, user_id, user_role)
+    return _single_flight.run(single_flight_key(query, user_role), lambda: execute_workflow(query, user_id, user_role))
+
+
+def single_flight_key(query: str, user_role: str):
+    # Responses depend only on the question and the role's access, not on the individual user
+    return normalize_query(query), user_role
+
+
+def execute_workflow(query: str, user_id: str, user_role: str):
+
+    app = get_workflow_app()
+   
+    # png_data = app.get_graph().draw_mermaid_png()
+    # with open('graph_diagram.png', 'wb') as f:
+    #     f.write(png_data)
     
-    final_state = app.invoke(initial_state)
+    final_state = app.invoke(initial_workflow_state(query, user_id))
     
     # Format final response
     response = format_final_response(final_state, final_state["status"])
+    cache_answer(query, user_role, response)
+    return response
+
+
+async def arun_workflow(query: str, user_id: str):
+    """run_workflow for the event loop: every LLM, embedding and vector store call is awaited."""
+    user_role = parse_user_role(user_id)
+    cached_response = await aget_cached_answer(query, user_role)
+    if cached_response is not None:
+        annotate("answer_cache", "hit")
+        return cached_response
+
+    if not SINGLE_FLIGHT_ENABLED:
+        return await aexecute_workflow(query, user_id, user_role)
+    return await _single_flight.arun(single_flight_key(query, user_role), lambda: aexecute_workflow(query, user_id, user_role))
+
+
+async def aexecute_workflow(query: str, user_id: str, user_role: str):
+
+    final_state = await get_workflow_app().ainvoke(initial_workflow_state(query, user_id))
+
+    response = format_final_response(final_state, final_state["status"])
+    await acache_answer(query, user_role, response)
     return response
-    
\ No newline at end of file
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    return _single_flight.stats()
+
+
+def stream_workflow(query: str, user_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the workflow and yield (event, data) pairs as it advances:
+    "node" when a node starts, "token" for each generated answer token,
+    "retraction" when an answer already streamed was rejected, and
+    "final" with the formatted response once the graph finishes.
+    """
+    user_role = parse_user_role(user_id)
+    cached_response = get_cached_answer(query, user_role)
+    if cached_response is not None:
+        yield "final", cached_response
+        return
+
+    app = get_workflow_app()
+    final_state = None
+    answer_streamed = False
+
+    for mode, chunk in app.stream(initial_workflow_state(query, user_id), stream_mode=["tasks", "custom", "values"]):
+        if mode == "values":
+            final_state = chunk
+        elif mode == "custom":
+            answer_streamed = True
+            yield "token", {"text": chunk["token"]}
+        elif "result" not in chunk:
+            # Task start; finished tasks carry a result and are not reported again
+            node = chunk["name"]
+            if answer_streamed and node in RETRACTING_NODES:
+                answer_streamed = False
+                yield "retraction", {"reason": RETRACTING_NODES[node]}
+            yield "node", {"node": node}
+
+    response = format_final_response(final_state, final_state["status"])
+    cache_answer(query, user_role, response)
+    yield "final", response
+
+
+async def astream_workflow(query: str, user_id: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Async stream_workflow yielding the same events."""
+    user_role = parse_user_role(user_id)
+    cached_response = await aget_cached_answer(query, user_role)
+    if cached_response is not None:
+        yield "final", cached_response
+        return
+
+    final_state = None
+    answer_streamed = False
+
+    async for mode, chunk in get_workflow_app().astream(initial_workflow_state(query, user_id), stream_mode=["tasks", "custom", "values"]):
+        if mode == "values":
+            final_state = chunk
+        elif mode == "custom":
+            answer_streamed = True
+            yield "token", {"text": chunk["token"]}
+        elif "result" not in chunk:
+            node = chunk["name"]
+            if answer_streamed and node in RETRACTING_NODES:
+                answer_streamed = False
+                yield "retraction", {"reason": RETRACTING_NODES[node]}
+            yield "node", {"node": node}
+
+    response = format_final_response(final_state, final_state["status"])
+    await acache_answer(query, user_role, response)
+    yield "final", response
@@ -1,5 +1,8 @@
 from typing import Dict, Any
 from utils.helpers import parse_user_role, get_authorized_access_levels
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def user_query_node(state: Dict[str, Any]) -> Dict[str, Any]:
     return state
@@ -9,17 +12,11 @@ def authorization_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Authorization node to determine user access levels based on role
     """
-    print("Checking user authorization...")
-    
     user_id = state["user_id"]
-    print(f"Raw user_id received: '{user_id}' (type: {type(user_id)})")
-    
     user_role = parse_user_role(user_id)
-    print(f"Parsed user_role: '{user_role}'")
-    
     authorized_access_levels = get_authorized_access_levels(user_role)
     
-    print(f"User: {user_role} | Access: {authorized_access_levels}")
+    logger.debug("Authorized user", extra={"user_id": user_id, "user_role": user_role, "access_levels": authorized_access_levels})
     
     # Update state
     state["user_role"] = user_role
@@ -1,8 +1,10 @@
 from typing import Dict, Any
 from utils.helpers import calculate_confidence_components
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def confidence_score_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("🔢 Calculating confidence score...")
     
     components = calculate_confidence_components(state)
 
@@ -27,7 +29,7 @@ def confidence_score_node(state: Dict[str, Any]) -> Dict[str, Any]:
     else:
         confidence_level = "low"
     
-    print(f"✅ Confidence: {confidence_score:.3f} ({confidence_level})")
+    logger.debug("Confidence %.3f (%s)", confidence_score, confidence_level)
     
     state["confidence_score"] = round(confidence_score, 3)
     state["confidence_level"] = confidence_level
@@ -2,10 +2,11 @@ from typing import Dict, Any
 from datetime import datetime
 import uuid
 from utils.helpers import check_sensitive_content
+from utils.log import get_logger
+
+logger = get_logger(__name__)
     
 def escalation_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
-
-    print("⚠️ Checking escalation criteria...")
   
     confidence_score = state["confidence_score"]
     query = state["query"]
@@ -35,16 +36,15 @@ def escalation_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "reason": ", ".join(escalation_reasons),
             "timestamp": datetime.now().isoformat()
         }
-        print(f"🚨 Escalation needed: {', '.join(escalation_reasons)}")
+        logger.info("Escalation needed", extra={"escalation_id": state["escalation_info"]["id"], "reason": state["escalation_info"]["reason"]})
     else:
-        print("✅ No escalation required")
+        logger.debug("No escalation required")
     
     return state
 
 
 def escalation_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Handle escalation process."""
-    print("🚨 Processing escalation...")
     
     # In production, this would:
     # 1. Send notifications to HRBP/Legal
@@ -53,6 +53,5 @@ def escalation_node(state: Dict[str, Any]) -> Dict[str, Any]:
     
     # For now, we just format the escalation response
     state["status"] = "escalated"
-    print("✅ Escalation response prepared")
     
     return state
\ No newline at end of file
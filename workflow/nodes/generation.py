@@ -1,25 +1,25 @@
 from typing import Dict, Any
-from langchain_openai import ChatOpenAI
 from utils.prompts import ANSWER_GENERATION_PROMPT
-from utils.helpers import extract_text_from_chunks
-from  settings import OPENAI_API_KEY
+from utils.llm_clients import get_llm
+from utils.log import get_logger
+from langgraph.config import get_stream_writer
+
+logger = get_logger(__name__)
+
+# (model, temperature) of the generation client; None keeps the model's default temperature
+GENERATION_LLM = ("gpt-4o-mini", None)
 
 def generation_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Generate answer using retrieved context."""
-    print("📝 Generating answer...")
     
     question = state["query"]
-    chunks = state["retrieved_chunks"]
     user_role = state["user_role"]
     
-    # Extract context from chunks
-    context = extract_text_from_chunks(chunks)
+    # Context packed by the retriever
+    context = state["packed_context"]
     
-    # Initialize LLM
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model="gpt-4o-mini",
-    )
+    # Shared LLM client
+    llm = get_llm(*GENERATION_LLM)
     
     # Generate answer
     prompt = ANSWER_GENERATION_PROMPT.format(
@@ -28,12 +28,42 @@ def generation_node(state: Dict[str, Any]) -> Dict[str, Any]:
         context=context
     )
     
-    response = llm.invoke(prompt)
-    answer = response.content.strip()
+    # Tokens are forwarded to stream_workflow() callers as they arrive; a no-op under invoke
+    write = get_stream_writer()
+    parts = []
+    for chunk in llm.stream(prompt):
+        if chunk.content:
+            parts.append(chunk.content)
+            write({"token": chunk.content})
+    answer = "".join(parts).strip()
+    
+    logger.debug("Generated answer (%d chars)", len(answer))
+    
+    state["generated_answer"] = answer
+    state["generation_retry_count"] = state.get("generation_retry_count", 0) + 1
+    
+    return state
+
+
+async def ageneration_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    
+    prompt = ANSWER_GENERATION_PROMPT.format(
+        user_role=state["user_role"],
+        question=state["query"],
+        context=state["packed_context"]
+    )
+    
+    write = get_stream_writer()
+    parts = []
+    async for chunk in get_llm(*GENERATION_LLM).astream(prompt):
+        if chunk.content:
+            parts.append(chunk.content)
+            write({"token": chunk.content})
+    answer = "".join(parts).strip()
     
-    print(f"✅ Generated answer ({len(answer)} chars)")
+    logger.debug("Generated answer (%d chars)", len(answer))
     
     state["generated_answer"] = answer
     state["generation_retry_count"] = state.get("generation_retry_count", 0) + 1
     
-    return state
\ No newline at end of file
+    return state
@@ -1,23 +1,74 @@
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, List, Optional
+import threading
+from settings import (
+    GRADER_FAST_PATH_ENABLED, GRADER_FAST_PATH_MIN_SCORE,
+    GRADER_FAST_PATH_MIN_AGREEMENT, GRADER_FAST_PATH_AGREEMENT_RANK
+)
 from utils.prompts import DOCUMENT_GRADER_PROMPT, QUERY_ENHANCER_PROMPT
-from utils.helpers import extract_text_from_chunks
-from  settings import OPENAI_API_KEY 
+from utils.llm_clients import get_llm
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# (model, temperature) of the LLM clients used by this module
+GRADER_LLM = ("gpt-4.1-mini", 0)
+ENHANCER_LLM = ("gpt-4o-mini", 0.3)
+
+_grader_paths = {"fast": 0, "llm": 0}
+_grader_paths_lock = threading.Lock()
+
+
+def fast_path_signals(chunks: List[Dict[str, Any]], agreement_rank: int = GRADER_FAST_PATH_AGREEMENT_RANK) -> Dict[str, Any]:
+    """Top fused score and how many chunks both retrieval legs ranked in their top agreement_rank."""
+    top_score = max((chunk.get("final_score", 0.0) for chunk in chunks), default=0.0)
+    agreement = sum(
+        1 for chunk in chunks
+        if chunk.get("dense_rank") is not None and chunk["dense_rank"] <= agreement_rank
+        and chunk.get("sparse_rank") is not None and chunk["sparse_rank"] <= agreement_rank
+    )
+    return {"top_score": top_score, "agreement": agreement}
+
+
+def fast_path_grade(chunks: List[Dict[str, Any]], min_score: float = GRADER_FAST_PATH_MIN_SCORE,
+                    min_agreement: int = GRADER_FAST_PATH_MIN_AGREEMENT) -> Optional[str]:
+    """Grade "yes" when retrieval is clearly relevant; None leaves the decision to the LLM grader."""
+    signals = fast_path_signals(chunks)
+    if signals["top_score"] >= min_score and signals["agreement"] >= min_agreement:
+        return "yes"
+    return None
+
+
+def record_grader_path(path: str) -> None:
+    with _grader_paths_lock:
+        _grader_paths[path] += 1
+        share = _grader_paths["fast"] / (_grader_paths["fast"] + _grader_paths["llm"])
+    metrics.increment("grader_decisions", path=path)
+    metrics.set_gauge("grader_fast_path_share", round(share, 4))
+
+
+def try_fast_path(state: Dict[str, Any]) -> bool:
+    if GRADER_FAST_PATH_ENABLED:
+        grade = fast_path_grade(state["retrieved_chunks"])
+        if grade is not None:
+            logger.debug("Document grade from retrieval scores: %s (LLM grader skipped)", grade)
+            state["document_grade"] = grade
+            record_grader_path("fast")
+            return True
+    record_grader_path("llm")
+    return False
 
 def grade_document_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("📊 Grading document relevance...")
+    
+    if try_fast_path(state):
+        return state
  
     question = state["query"]
-    chunks = state["retrieved_chunks"]   
     
-    # Extract text from chunks
-    documents = extract_text_from_chunks(chunks)  
+    # Context packed by the retriever
+    documents = state["packed_context"]
     
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model="gpt-4.1-mini",
-        temperature=0
-    )
+    llm = get_llm(*GRADER_LLM)
     
     # Grade relevance
     prompt = DOCUMENT_GRADER_PROMPT.format(
@@ -28,33 +79,61 @@ def grade_document_node(state: Dict[str, Any]) -> Dict[str, Any]:
     response = llm.invoke(prompt)
     grade = response.content.strip().lower()
     
-    print(f"✅ Document grade: {grade}")
+    logger.debug("Document grade: %s", grade)
+    
+    state["document_grade"] = grade
+    return state
+
+
+async def agrade_document_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    
+    if try_fast_path(state):
+        return state
+    
+    prompt = DOCUMENT_GRADER_PROMPT.format(
+        question=state["query"],
+        documents=state["packed_context"]
+    )
+    
+    response = await get_llm(*GRADER_LLM).ainvoke(prompt)
+    grade = response.content.strip().lower()
+    
+    logger.debug("Document grade: %s", grade)
     
     state["document_grade"] = grade
     return state
 
 
 def query_enhancer_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("🔄 Enhancing query...")
   
     original_query = state["query"]
     retry_count = state.get("retry_count", 0)
     
-    # Initialize LLM
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0.3
-    )
+    # Shared LLM client
+    llm = get_llm(*ENHANCER_LLM)
     
     # Enhance query
     prompt = QUERY_ENHANCER_PROMPT.format(query=original_query)
     response = llm.invoke(prompt)
     enhanced_query = response.content.strip()
     
-    print(f"✅ Enhanced query: {enhanced_query}...")
+    logger.debug("Enhanced query (%d chars)", len(enhanced_query))
     
     state["enhanced_query"] = enhanced_query
     state["retry_count"] = retry_count + 1
     
-    return state
\ No newline at end of file
+    return state
+
+
+async def aquery_enhancer_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    
+    prompt = QUERY_ENHANCER_PROMPT.format(query=state["query"])
+    response = await get_llm(*ENHANCER_LLM).ainvoke(prompt)
+    enhanced_query = response.content.strip()
+    
+    logger.debug("Enhanced query (%d chars)", len(enhanced_query))
+    
+    state["enhanced_query"] = enhanced_query
+    state["retry_count"] = state.get("retry_count", 0) + 1
+    
+    return state
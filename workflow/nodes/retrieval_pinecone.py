@@ -1,59 +1,164 @@
 from typing import Dict, Any, List
 from langchain_openai import OpenAIEmbeddings
-from pinecone import Pinecone
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import pickle
-import os
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import logging
+import time
 import numpy as np
-from settings import (
-    OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX_NAME
-)
+from settings import SPARSE_RETRIEVER, RETRIEVAL_WORKERS
+from utils import metrics
+from utils.embeddings import embed_query, aembed_query, get_embeddings_model
+from utils.helpers import get_allowed_sources
+from utils.vector_store import get_vector_store
+from utils.sparse_index import get_sparse_index
+from utils.context_packer import pack_context
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Prompt tokens saved by context packing
+TOKEN_BUCKETS = (0, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# The sparse leg runs here so it overlaps with the query embedding and dense search; async
+# requests also fuse here, so they never wait on the event loop's shared default executor
+_retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def atimed(awaitable):
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
 
 def document_retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
      
-    print("🔍 Modern Hybrid Retrieval with Access Control: Dense + Sparse + Re-ranking...")
-    
     query = state.get("enhanced_query", state["query"])
     user_role = state.get("user_role", "employee")   
     
-    print(f"🔐 Filtering for user role: {user_role}")
+    start = time.perf_counter()
     
-    # Create embeddings once to save costs
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model="text-embedding-ada-002")
-    query_embedding = embeddings.embed_query(query)
+    # The sparse leg doesn't need the embedding, so start it first; it runs in this
+    # request's context so its log lines keep the request ID
+    sparse_future = _retrieval_executor.submit(contextvars.copy_context().run, timed, perform_sparse_search, query, user_role)
     
-    dense_chunks = perform_dense_search(query, user_role, query_embedding=query_embedding)
+    # Repeated questions and enhanced-query retries are served from the embedding cache
+    embeddings = get_embeddings_model()
+    query_embedding, embedding_seconds = timed(embed_query, query)
+    
+    dense_chunks, dense_seconds = timed(perform_dense_search, query, user_role, query_embedding=query_embedding)
      
-    sparse_chunks = perform_sparse_search(query, user_role)
+    sparse_chunks, sparse_seconds = sparse_future.result()
+    legs_seconds = time.perf_counter() - start
+    
+    hybrid_chunks, fusion_seconds = timed(reciprocal_rank_fusion, dense_chunks, sparse_chunks, query, query_embedding=query_embedding, embeddings=embeddings)
+    
+    return record_retrieval(state, hybrid_chunks, embedding_seconds, dense_seconds, sparse_seconds, fusion_seconds, legs_seconds)
+
+
+async def adocument_retriever_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async document_retriever_node: same legs and fusion, awaited instead of blocking."""
+    
+    query = state.get("enhanced_query", state["query"])
+    user_role = state.get("user_role", "employee")
+    
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    
+    sparse_future = loop.run_in_executor(_retrieval_executor, contextvars.copy_context().run, timed, perform_sparse_search, query, user_role)
+    
+    embeddings = get_embeddings_model()
+    query_embedding, embedding_seconds = await atimed(aembed_query(query))
+    
+    dense_chunks, dense_seconds = await atimed(aperform_dense_search(query, user_role, query_embedding=query_embedding))
+    
+    sparse_chunks, sparse_seconds = await sparse_future
+    legs_seconds = time.perf_counter() - start
+    
+    # Fusion is numpy work over stored vectors (and may embed missing ones), so it runs in a worker thread
+    hybrid_chunks, fusion_seconds = await loop.run_in_executor(
+        _retrieval_executor, contextvars.copy_context().run, functools.partial(
+            timed, reciprocal_rank_fusion, dense_chunks, sparse_chunks, query, query_embedding=query_embedding, embeddings=embeddings
+        )
+    )
+    
+    return record_retrieval(state, hybrid_chunks, embedding_seconds, dense_seconds, sparse_seconds, fusion_seconds, legs_seconds)
+
+
+def record_retrieval(state: Dict[str, Any], hybrid_chunks: List[Dict], embedding_seconds: float, dense_seconds: float,
+                     sparse_seconds: float, fusion_seconds: float, legs_seconds: float) -> Dict[str, Any]:
+    
+    timings = {
+        "embedding": embedding_seconds,
+        "dense": dense_seconds,
+        "sparse": sparse_seconds,
+        "fusion": fusion_seconds,
+        "legs_wall": legs_seconds,
+        # Time the sequential version would have spent on top of the concurrent one
+        "overlap_saved": max(0.0, embedding_seconds + dense_seconds + sparse_seconds - legs_seconds),
+    }
+    for leg, seconds in timings.items():
+        metrics.observe("retrieval_seconds", seconds, leg=leg)
     
-    hybrid_chunks = reciprocal_rank_fusion(dense_chunks, sparse_chunks, query, query_embedding=query_embedding, embeddings=embeddings)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Retrieval timings", extra={"timings_ms": {leg: round(seconds * 1000) for leg, seconds in timings.items()}})
     
+    # Packed once here; grading, generation and validation all reuse the same context
+    packed_context, context_stats = pack_context(hybrid_chunks)
+    metrics.observe("context_tokens_saved", context_stats["tokens_saved"], buckets=TOKEN_BUCKETS)
+    metrics.increment("context_tokens_saved_total", context_stats["tokens_saved"])
+    logger.debug("Packed context", extra={"context_stats": context_stats})
+    
+    state["retrieval_timings"] = {leg: round(seconds, 4) for leg, seconds in timings.items()}
     state["retrieved_chunks"] = hybrid_chunks
+    state["packed_context"] = packed_context
+    state["context_stats"] = context_stats
     return state
 
 
 def perform_dense_search(query: str, user_role: str = "employee", top_k: int = 15, query_embedding: List[float] = None) -> List[Dict[str, Any]]:
-  
-    print(f"🧠 Performing dense semantic search with access control...")
     
+    allowed_sources = get_allowed_sources(user_role)
+    logger.debug("Restricting dense search to sources", extra={"sources": allowed_sources})
     
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    index = pc.Index(PINECONE_INDEX_NAME)
+    matches = get_vector_store().query(
+        query_embedding,
+        top_k=top_k,
+        allowed_sources=allowed_sources,
+        include_values=True  # Reused by the RRF semantic boost instead of re-embedding
+    )
+    
+    return format_dense_matches(matches)
+
+
+async def aperform_dense_search(query: str, user_role: str = "employee", top_k: int = 15, query_embedding: List[float] = None) -> List[Dict[str, Any]]:
     
-    metadata_filter = create_access_filter(user_role)
-    print(f"🔐 Applying metadata filter: {metadata_filter}")
+    allowed_sources = get_allowed_sources(user_role)
+    logger.debug("Restricting dense search to sources", extra={"sources": allowed_sources})
     
-    search_results = index.query(
-        vector=query_embedding,
+    matches = await get_vector_store().aquery(
+        query_embedding,
         top_k=top_k,
-        include_metadata=True,
-        filter=metadata_filter  
+        allowed_sources=allowed_sources,
+        include_values=True
     )
     
+    return format_dense_matches(matches)
+
+
+def format_dense_matches(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    
     retrieved_chunks = []
-    for match in search_results.matches:
-        metadata = match.metadata
+    for match in matches:
+        metadata = match["metadata"]
         
         formatted_chunk = {
             "content": metadata.get("content", ""),
@@ -62,187 +167,133 @@ def perform_dense_search(query: str, user_role: str = "employee", top_k: int = 1
                 "page": metadata.get("page"),
                 "document_type": metadata.get("document_type"),
                 "department": metadata.get("department"),
-                "chunk_id": metadata.get("chunk_id", ""),
+                "chunk_id": metadata.get("chunk_id") or match["id"],
+                "chunk_index": metadata.get("chunk_index"),
             },
-            "score": match.score,
+            "embedding": match["values"],
+            "score": match["score"],
             "search_type": "dense",
             "rank": len(retrieved_chunks) + 1
         }
         retrieved_chunks.append(formatted_chunk)
     
-    print(f"✅ Dense search retrieved {len(retrieved_chunks)} authorized chunks")
+    logger.debug("Dense search retrieved %d authorized chunks", len(retrieved_chunks))
     return retrieved_chunks
 
 
-def create_access_filter(user_role: str) -> Dict[str, Any]:
-    
-    if user_role == "hr":
-        allowed_sources = ["novacorp_employee_handbook.txt", "novacorp_managers_guide.txt", "novacorp_hr_legal_manual.txt"]
-    elif user_role == "manager":
-        allowed_sources = ["novacorp_employee_handbook.txt", "novacorp_managers_guide.txt"]
-    else:  
-        allowed_sources = ["novacorp_employee_handbook.txt"]
-
-    filter_conditions = {
-        "source": {"$in": allowed_sources}
-    }
-    
-    return filter_conditions
-
-
 def perform_sparse_search(query: str, user_role: str = "employee", top_k: int = 15) -> List[Dict[str, Any]]:
  
-    print(f"📝 Performing sparse TF-IDF search with access control...")
-    
-    tfidf_path = "tfidf_vectorizer.pkl"
-    corpus_path = "document_corpus.pkl"
-    tfidf_matrix_path = "tfidf_matrix.pkl"
-    
-    if not all(os.path.exists(path) for path in [tfidf_path, corpus_path, tfidf_matrix_path]):
-        print("⚠️ TF-IDF index not found, creating from Pinecone data...")
-        create_sparse_index()
- 
-    with open(tfidf_path, 'rb') as f:
-        tfidf_vectorizer = pickle.load(f)
-    
-    with open(corpus_path, 'rb') as f:
-        corpus_docs = pickle.load(f)
-        
-    with open(tfidf_matrix_path, 'rb') as f:
-        tfidf_matrix = pickle.load(f)
-    
-    filtered_docs = []
-    filtered_indices = []
+    sparse_index = get_sparse_index()
     
-    print(f"🔍 Total documents in corpus: {len(corpus_docs)}")
+    # The index is built by the ingestion pipeline; never rebuild it on the request path.
+    # get_sparse_index() warns once and /api/ready reports not ready while it is missing
+    if sparse_index is None:
+        logger.debug("No sparse index, skipping sparse search")
+        return []
     
-    for idx, doc in enumerate(corpus_docs):
-        if is_document_accessible(doc, user_role):
-            filtered_docs.append(doc)
-            filtered_indices.append(idx)
+    # Rows this role may see were partitioned when the index was loaded
+    partition = sparse_index.partition(user_role)
     
-    print(f"✅ Documents after access filtering: {len(filtered_docs)}")
+    logger.debug("Sparse %s search over %d of %d documents for %s", SPARSE_RETRIEVER, len(partition.docs), len(sparse_index.corpus_docs), user_role)
     
-    filtered_tfidf_matrix = tfidf_matrix[filtered_indices]
-    
-    query_vector = tfidf_vectorizer.transform([query.lower()])
- 
-    similarities = cosine_similarity(query_vector, filtered_tfidf_matrix).flatten()
-
-    top_indices = np.argsort(similarities)[::-1][:top_k]
+    if sparse_index.bm25 is not None:
+        top_docs, top_scores = search_bm25(sparse_index, partition, query, top_k)
+    else:
+        top_docs, top_scores = search_tfidf(sparse_index, partition, query, top_k)
     
+    # Checked once, so the per-chunk lines cost nothing unless DEBUG is on
+    log_chunks = logger.isEnabledFor(logging.DEBUG)
     retrieved_chunks = []
-    for rank, idx in enumerate(top_indices):
-        if similarities[idx] > 0.01:  # Minimum similarity threshold
-            doc = filtered_docs[idx]
-            doc_source = doc["metadata"].get("source", "unknown")
-            print(f"📄 Retrieved chunk {rank+1}: source='{doc_source}', similarity={similarities[idx]:.4f}")
+    for rank, (doc, score) in enumerate(zip(top_docs, top_scores)):
+        if score > 0.01:  # Minimum similarity threshold
+            if log_chunks:
+                logger.debug("Sparse chunk %d: source=%r, similarity=%.4f", rank + 1, doc["metadata"].get("source", "unknown"), score)
             
             formatted_chunk = {
                 "content": doc["content"],
                 "metadata": doc["metadata"],
-                "score": float(similarities[idx]),
+                "score": float(score),
                 "search_type": "sparse",
                 "rank": rank + 1
             }
             retrieved_chunks.append(formatted_chunk)
     
-    print(f"✅ Sparse search retrieved {len(retrieved_chunks)} authorized chunks")
+    logger.debug("Sparse search retrieved %d authorized chunks", len(retrieved_chunks))
     return retrieved_chunks
 
 
-
-def is_document_accessible(doc: Dict[str, Any], user_role: str) -> bool:
-    """Check if document is accessible based on user role and document source"""
-    
-    doc_source = doc["metadata"].get("source", "")
+def search_tfidf(sparse_index, partition, query: str, top_k: int):
     
-  
-    if user_role == "hr":
+    query_vector = sparse_index.vectorizer.transform([query.lower()])
  
-        allowed_sources = ["novacorp_employee_handbook.txt", "novacorp_managers_guide.txt", "novacorp_hr_legal_manual.txt"]
-    elif user_role == "manager":
- 
-        allowed_sources = ["novacorp_employee_handbook.txt", "novacorp_managers_guide.txt"]
-    else:   
-        allowed_sources = ["novacorp_employee_handbook.txt"]
+    similarities = cosine_similarity(query_vector, partition.matrix).flatten()
+
+    top_indices = np.argsort(similarities)[::-1][:top_k]
     
-    return doc_source in allowed_sources
-        
+    return [partition.docs[idx] for idx in top_indices], similarities[top_indices]
 
-def create_sparse_index():
-    """Create TF-IDF sparse index from Pinecone data"""
-    print("🔧 Creating TF-IDF sparse index from Pinecone data...")
-    try:
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-        index = pc.Index(PINECONE_INDEX_NAME)
-        
-        # Get all documents from Pinecone
-        query_result = index.query(
-            vector=[0.0] * 1536,   
-            top_k=10000, 
-            include_metadata=True
-        )
-        
-        corpus_texts = []
-        corpus_docs = []
-        
-        for match in query_result.matches:
-            metadata = match.metadata
-            content = metadata.get("content", "")
-            
-            if content:
-                corpus_texts.append(content.lower())
-                
-                # Store document with metadata
-                doc = {
-                    "content": content,
-                    "metadata": {
-                        "source": metadata.get("source"),
-                        "page": metadata.get("page"),
-                        "document_type": metadata.get("document_type"),
-                        "department": metadata.get("department"),
-                        "chunk_id": metadata.get("chunk_id", ""),
-                    }
-                }
-                corpus_docs.append(doc)
-        
-        # Create TF-IDF vectorizer
-        tfidf_vectorizer = TfidfVectorizer(
-            max_features=10000,
-            ngram_range=(1, 3),
-            stop_words='english',
-            min_df=2,
-            max_df=0.95,
-            sublinear_tf=True,
-            norm='l2'
-        )
-        
-        # Fit and transform the corpus
-        tfidf_matrix = tfidf_vectorizer.fit_transform(corpus_texts)
-        
-        # Save components
-        with open("tfidf_vectorizer.pkl", 'wb') as f:
-            pickle.dump(tfidf_vectorizer, f)
-        
-        with open("document_corpus.pkl", 'wb') as f:
-            pickle.dump(corpus_docs, f)
-            
-        with open("tfidf_matrix.pkl", 'wb') as f:
-            pickle.dump(tfidf_matrix, f)
-        
-        print(f"✅ TF-IDF index created with {len(corpus_docs)} documents and {tfidf_matrix.shape[1]} features")
-        
-    except Exception as e:
-        print(f"❌ Failed to create TF-IDF index: {e}")
+
+def search_bm25(sparse_index, partition, query: str, top_k: int):
+    
+    # BM25 scores only the postings of the query terms inside the role's rows
+    doc_ids, scores = sparse_index.bm25.search(
+        query, top_k,
+        row_start=partition.row_start,
+        row_stop=partition.row_stop,
+        row_mask=partition.row_mask
+    )
+    
+    return [sparse_index.corpus_docs[idx] for idx in doc_ids], scores
+
+
+def load_chunk_vector_store() -> Dict[str, np.ndarray]:
+    """Return the chunk_id -> vector map written alongside the sparse index."""
+    sparse_index = get_sparse_index()
+    return sparse_index.chunk_vectors if sparse_index is not None else {}
 
 
+def collect_chunk_vectors(chunks: List[Dict], embeddings: OpenAIEmbeddings) -> np.ndarray:
+    """
+    Gather one embedding per chunk: dense hits carry their Pinecone values, sparse-only
+    hits are looked up by chunk_id, and anything still missing is embedded in one batch.
+    """
+    vector_store = load_chunk_vector_store()
+    vectors = []
+    missing = []
+    
+    for position, chunk in enumerate(chunks):
+        vector = chunk.get("embedding")
+        if vector is None:
+            vector = vector_store.get(chunk["metadata"].get("chunk_id"))
+        if vector is None:
+            missing.append(position)
+        vectors.append(vector)
+    
+    if missing:
+        logger.debug("Embedding %d chunks without stored vectors in one batch", len(missing))
+        missing_embeddings = embeddings.embed_documents([chunks[position]["content"][:500] for position in missing])
+        for position, vector in zip(missing, missing_embeddings):
+            vectors[position] = vector
+    
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def compute_semantic_similarities(chunks: List[Dict], query_embedding: List[float], embeddings: OpenAIEmbeddings) -> np.ndarray:
+    """Cosine similarity between the query and every chunk as a single matrix-vector product."""
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    
+    chunk_matrix = collect_chunk_vectors(chunks, embeddings)
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    
+    norms = np.linalg.norm(chunk_matrix, axis=1) * np.linalg.norm(query_vector)
+    norms[norms == 0] = 1.0
+    
+    return (chunk_matrix @ query_vector) / norms
+
 
 def reciprocal_rank_fusion(dense_chunks: List[Dict], sparse_chunks: List[Dict], query: str, k: int = 60, query_embedding: List[float] = None, embeddings: OpenAIEmbeddings = None) -> List[Dict]:
  
-    print("🔄 Applying Reciprocal Rank Fusion...")
-    print(f"📊 Input: {len(dense_chunks)} dense chunks, {len(sparse_chunks)} sparse chunks")
-    
     # Create document scoring map
     doc_scores = {}
     
@@ -282,25 +333,22 @@ def reciprocal_rank_fusion(dense_chunks: List[Dict], sparse_chunks: List[Dict],
     
  
     
+    # Semantic similarity boost for re-ranking, computed for all candidates at once
+    candidates = [scores["chunk"] for scores in doc_scores.values()]
+    similarities = compute_semantic_similarities(candidates, query_embedding, embeddings)
+    
     final_results = []
-    for chunk_id, scores in doc_scores.items():
+    for (chunk_id, scores), similarity in zip(doc_scores.items(), similarities):
         
         rrf_score = scores["dense_rrf"] + scores["sparse_rrf"]
-        
-        # Semantic similarity boost for re-ranking
-        chunk_content = scores["chunk"]["content"]
-        chunk_embedding = embeddings.embed_query(chunk_content[:500])  # Limit content for efficiency
-        
-        # Calculate cosine similarity
-        similarity = np.dot(query_embedding, chunk_embedding) / (
-            np.linalg.norm(query_embedding) * np.linalg.norm(chunk_embedding)
-        )
+        similarity = float(similarity)
         
         # Final hybrid score with semantic boost
         final_score = rrf_score + (0.1 * similarity)  # Small semantic boost
         
         # Create enhanced result
         enhanced_chunk = scores["chunk"].copy()
+        enhanced_chunk.pop("embedding", None)  # Keep vectors out of the workflow state
         enhanced_chunk.update({
             "rrf_score": rrf_score,
             "semantic_similarity": similarity,
@@ -316,10 +364,10 @@ def reciprocal_rank_fusion(dense_chunks: List[Dict], sparse_chunks: List[Dict],
     final_results.sort(key=lambda x: x["final_score"], reverse=True)
     top_results = final_results[:8]
     
-    print(f"✅ RRF fusion: {len(doc_scores)} unique docs → {len(top_results)} final results")
+    logger.debug("RRF fusion: %d dense + %d sparse chunks, %d unique docs -> %d results", len(dense_chunks), len(sparse_chunks), len(doc_scores), len(top_results))
     
     if top_results:
         top_result = top_results[0]
-        print(f"🏆 Top result: RRF={top_result['rrf_score']:.4f}, Semantic={top_result['semantic_similarity']:.4f}, Final={top_result['final_score']:.4f}")
+        logger.debug("Top result: RRF=%.4f, semantic=%.4f, final=%.4f", top_result["rrf_score"], top_result["semantic_similarity"], top_result["final_score"])
     
     return top_results
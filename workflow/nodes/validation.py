@@ -1,25 +1,29 @@
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from utils.prompts import HALLUCINATION_CHECK_PROMPT, RELEVANCE_CHECK_PROMPT
-from utils.helpers import extract_text_from_chunks
-from settings import OPENAI_API_KEY 
+from typing import Dict, Any, Literal
+from functools import lru_cache
+from pydantic import BaseModel, Field
+from settings import VERIFICATION_RATIONALE
+from utils.prompts import (
+    HALLUCINATION_CHECK_PROMPT, RELEVANCE_CHECK_PROMPT,
+    FUSED_VERIFICATION_PROMPT, FUSED_VERIFICATION_RATIONALE_INSTRUCTION
+)
+from utils.llm_clients import get_llm
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# (model, temperature) of the client used by both answer checks
+VALIDATION_LLM = ("gpt-4o-mini", 0)
 
 
 def hallucination_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("🔍 Checking for hallucinations...")
    
     answer = state["generated_answer"]
-    chunks = state["retrieved_chunks"]
     
-    # Extract source documents
-    documents = extract_text_from_chunks(chunks)
+    # Same packed context the answer was generated from
+    documents = state["packed_context"]
     
-    # Initialize LLM
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0
-    )
+    # Shared LLM client
+    llm = get_llm(*VALIDATION_LLM)
     
     # Check for hallucinations
     prompt = HALLUCINATION_CHECK_PROMPT.format(
@@ -30,24 +34,34 @@ def hallucination_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
     response = llm.invoke(prompt)
     check_result = response.content.strip().lower()
     
-    print(f"✅ Hallucination check: {check_result}")
+    logger.debug("Hallucination check: %s", check_result)
+    
+    # Runs in parallel with the relevance check, so only return the key this node owns
+    return {"hallucination_check": check_result}
+
+
+async def ahallucination_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    
+    prompt = HALLUCINATION_CHECK_PROMPT.format(
+        answer=state["generated_answer"],
+        documents=state["packed_context"]
+    )
+    
+    response = await get_llm(*VALIDATION_LLM).ainvoke(prompt)
+    check_result = response.content.strip().lower()
+    
+    logger.debug("Hallucination check: %s", check_result)
     
-    state["hallucination_check"] = check_result
-    return state
+    return {"hallucination_check": check_result}
 
 
 def relevance_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("🎯 Checking answer relevance...")
 
     question = state["query"]
     answer = state["generated_answer"]
     
    
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model="gpt-4o-mini",
-        temperature=0
-    )
+    llm = get_llm(*VALIDATION_LLM)
     
     
     prompt = RELEVANCE_CHECK_PROMPT.format(
@@ -58,7 +72,71 @@ def relevance_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
     response = llm.invoke(prompt)
     check_result = response.content.strip().lower()
     
-    print(f"✅ Relevance check: {check_result}")
+    logger.debug("Relevance check: %s", check_result)
+    
+    # Runs in parallel with the hallucination check, so only return the key this node owns
+    return {"relevance_check": check_result}
+
+
+async def arelevance_check_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    
+    prompt = RELEVANCE_CHECK_PROMPT.format(
+        question=state["query"],
+        answer=state["generated_answer"]
+    )
     
-    state["relevance_check"] = check_result
-    return state
\ No newline at end of file
+    response = await get_llm(*VALIDATION_LLM).ainvoke(prompt)
+    check_result = response.content.strip().lower()
+    
+    logger.debug("Relevance check: %s", check_result)
+    
+    return {"relevance_check": check_result}
+
+
+class VerificationVerdict(BaseModel):
+    """Both answer checks from a single call."""
+    hallucination: Literal["yes", "no"] = Field(description="yes if the answer contains unsupported information")
+    relevance: Literal["yes", "no"] = Field(description="yes if the answer addresses the question")
+
+
+class VerificationVerdictWithRationale(VerificationVerdict):
+    rationale: str = Field(description="Short explanation of both verdicts")
+
+
+@lru_cache(maxsize=None)
+def verification_llm():
+    schema = VerificationVerdictWithRationale if VERIFICATION_RATIONALE else VerificationVerdict
+    return get_llm(*VALIDATION_LLM).with_structured_output(schema)
+
+
+def fused_verification_prompt(state: Dict[str, Any]) -> str:
+    # The source documents are sent once instead of once per check
+    return FUSED_VERIFICATION_PROMPT.format(
+        question=state["query"],
+        answer=state["generated_answer"],
+        documents=state["packed_context"],
+        rationale_instruction=FUSED_VERIFICATION_RATIONALE_INSTRUCTION if VERIFICATION_RATIONALE else ""
+    )
+
+
+def verification_result(verdict: VerificationVerdict) -> Dict[str, Any]:
+    logger.debug("Hallucination check: %s, relevance check: %s", verdict.hallucination, verdict.relevance)
+    return {
+        "hallucination_check": verdict.hallucination,
+        "relevance_check": verdict.relevance,
+        "verification_rationale": getattr(verdict, "rationale", None)
+    }
+
+
+def fused_verification_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Hallucination and relevance checks in one structured-output call (VERIFICATION_MODE=fused)."""
+    return verification_result(verification_llm().invoke(fused_verification_prompt(state)))
+
+
+async def afused_verification_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    return verification_result(await verification_llm().ainvoke(fused_verification_prompt(state)))
+
+
+def validation_join_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Waits for both parallel checks before check_validation routes on their results."""
+    return {}
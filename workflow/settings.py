@@ -4,10 +4,126 @@ from dotenv import load_dotenv
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+
+# Model provider: "openai", or "fake" for offline load tests (rule-based answers, hashed embeddings).
+# The fake injects per-call latency (mean +/- uniform jitter, ms) and 429 / 500 error rates.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+FAKE_EMBEDDING_DIMENSION = int(os.getenv("FAKE_EMBEDDING_DIMENSION", "1536"))
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "0"))
+FAKE_LATENCY_JITTER_MS = float(os.getenv("FAKE_LATENCY_JITTER_MS", "0"))
+FAKE_RATE_LIMIT_RATE = float(os.getenv("FAKE_RATE_LIMIT_RATE", "0"))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_SEED = int(os.getenv("FAKE_SEED", "0"))
+
+# Logging: level, "text" or "json" lines, and the size of the bounded queue between request
+# threads and the background writer (when it is full records are dropped and counted, never waited on)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Keep-alive HTTP connection pool shared by all LLM clients
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "50"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+# Upstream call governor, per model: adaptive concurrency cap (AIMD between min and max, cut on
+# 429s and when latency exceeds tolerance x its moving baseline), seconds a call may wait for a slot,
+# jittered exponential retries, and a circuit breaker that fails fast after consecutive failures
+GOVERNOR_INITIAL_LIMIT = int(os.getenv("GOVERNOR_INITIAL_LIMIT", "16"))
+GOVERNOR_MIN_LIMIT = int(os.getenv("GOVERNOR_MIN_LIMIT", "1"))
+GOVERNOR_MAX_LIMIT = int(os.getenv("GOVERNOR_MAX_LIMIT", "64"))
+GOVERNOR_LATENCY_TOLERANCE = float(os.getenv("GOVERNOR_LATENCY_TOLERANCE", "2.0"))
+GOVERNOR_ACQUIRE_TIMEOUT = float(os.getenv("GOVERNOR_ACQUIRE_TIMEOUT", "60"))
+GOVERNOR_MAX_RETRIES = int(os.getenv("GOVERNOR_MAX_RETRIES", "4"))
+GOVERNOR_BACKOFF_BASE = float(os.getenv("GOVERNOR_BACKOFF_BASE", "0.5"))
+GOVERNOR_BACKOFF_MAX = float(os.getenv("GOVERNOR_BACKOFF_MAX", "20"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))
+
+# Lets /api/workflow callers send "debug": true to get node timings, LLM calls, tokens,
+# retries and route decisions for their request attached to the response
+REQUEST_TRACE_ENABLED = os.getenv("REQUEST_TRACE_ENABLED", "false").lower() == "true"
+
+# Micro-batching of query embeddings across concurrent requests: a batch is sent after the
+# window (milliseconds from its first query) or once it holds the max size; workers send batches
+EMBEDDING_BATCH_ENABLED = os.getenv("EMBEDDING_BATCH_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_WORKERS = int(os.getenv("EMBEDDING_BATCH_WORKERS", "4"))
+
+# On-disk cache of temperature=0 LLM responses, shared by all worker processes
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+
+# Query embedding cache: max entries and time-to-live in seconds
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
 
  
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "hr-rag-index")
+# Keep-alive HTTP connections held by the shared Pinecone client
+PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", "20"))
+# Threads running blocking vector store queries for the async request path; matching the
+# connection pool lets every pooled connection be busy without threads queueing on it
+VECTOR_STORE_WORKERS = int(os.getenv("VECTOR_STORE_WORKERS", str(PINECONE_POOL_SIZE)))
+
+# Dense vector backend: "pinecone" or "local" (memory-mapped NumPy matrix on disk)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_store"))
+# Approximate search for large local corpora: number of IVF lists (0 = exact only) and lists probed per query
+VECTOR_STORE_IVF_LISTS = int(os.getenv("VECTOR_STORE_IVF_LISTS", "0"))
+VECTOR_STORE_IVF_NPROBE = int(os.getenv("VECTOR_STORE_IVF_NPROBE", "8"))
+
+# Access level of every ingested source document; roles map to access levels in utils.helpers
+DOCUMENT_ACCESS_LEVELS = {
+    "novacorp_employee_handbook.txt": "public",
+    "novacorp_managers_guide.txt": "manager",
+    "novacorp_hr_legal_manual.txt": "hr",
+}
+
+# Sparse (TF-IDF) index artifacts and how often to check them for changes, in seconds
+SPARSE_INDEX_DIR = os.getenv("SPARSE_INDEX_DIR", os.path.dirname(os.path.abspath(__file__)))
+SPARSE_INDEX_RELOAD_INTERVAL = float(os.getenv("SPARSE_INDEX_RELOAD_INTERVAL", "5"))
+
+# Semantic answer cache: reuse a role's cached response when a query is this similar to a cached one.
+# Off by default: with ada-002, questions differing in one key word ("leave policy for managers" vs
+# "... for interns") can score above 0.97, so calibrate the threshold on real query pairs before enabling
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97"))
+ANSWER_CACHE_CAPACITY = int(os.getenv("ANSWER_CACHE_CAPACITY", "1000"))  # entries per role
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+
+# Identical in-flight queries (same normalized text and role) share one workflow execution;
+# waiting requests give up after this many seconds and run their own
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_MAX_WAIT = float(os.getenv("SINGLE_FLIGHT_MAX_WAIT", "30"))
+
+# Threads running the sparse retrieval leg concurrently with the dense leg, and RRF fusion
+# for the async request path
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "8"))
+
+# Prompt context packing: token budget for the retrieved context and the shingle overlap
+# above which a segment counts as a near-duplicate of a better-scored one
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+# Document grader fast path: mark retrieval relevant without the LLM grader when the top fused
+# final_score reaches the threshold and enough chunks rank in the top N of both dense and sparse
+# search. Calibrate the thresholds with calibrate_grader.py before enabling.
+GRADER_FAST_PATH_ENABLED = os.getenv("GRADER_FAST_PATH_ENABLED", "false").lower() == "true"
+GRADER_FAST_PATH_MIN_SCORE = float(os.getenv("GRADER_FAST_PATH_MIN_SCORE", "0.11"))
+GRADER_FAST_PATH_MIN_AGREEMENT = int(os.getenv("GRADER_FAST_PATH_MIN_AGREEMENT", "2"))
+GRADER_FAST_PATH_AGREEMENT_RANK = int(os.getenv("GRADER_FAST_PATH_AGREEMENT_RANK", "5"))
+
+# Answer verification: "separate" (hallucination and relevance LLM calls in parallel) or
+# "fused" (one structured-output call returning both verdicts), optionally with a rationale
+VERIFICATION_MODE = os.getenv("VERIFICATION_MODE", "separate").lower()
+VERIFICATION_RATIONALE = os.getenv("VERIFICATION_RATIONALE", "false").lower() == "true"
+
+# Sparse retrieval engine: "tfidf" (sklearn vectorizer + cosine) or "bm25" (inverted index)
+SPARSE_RETRIEVER = os.getenv("SPARSE_RETRIEVER", "tfidf").lower()
 
 SENSITIVE_KEYWORDS = [
      
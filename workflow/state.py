@@ -13,6 +13,9 @@ class WorkflowState(TypedDict):
     
     # Retrieval
     retrieved_chunks: List[Dict[str, Any]]
+    retrieval_timings: Dict[str, float]
+    packed_context: str
+    context_stats: Dict[str, Any]
     
     # Processing
     document_grade: str
@@ -24,6 +27,7 @@ class WorkflowState(TypedDict):
     generated_answer: str
     hallucination_check: str
     relevance_check: str
+    verification_rationale: Optional[str]
     
     # Confidence & Escalation
     confidence_score: float
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Workflow modules import each other flat (from settings import ..., from utils.x import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import importlib
+import numpy as np
+import pytest
+import settings
+from utils import answer_cache
+from utils.answer_cache import SemanticAnswerCache
+from utils.fake_provider import hashed_embedding
+
+CACHED_QUESTION = "What is the leave policy for managers?"
+LOOKALIKES = [
+    "What is the leave policy for interns?",
+    "What is the sick leave policy for managers?",
+    "What is the leave policy for contractors?",
+]
+
+
+def response(answer: str):
+    return {"status": "success", "answer": answer}
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    cache = SemanticAnswerCache(settings.ANSWER_CACHE_THRESHOLD, capacity=16, ttl=3600)
+    monkeypatch.setattr(answer_cache, "_answer_cache", cache)
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(answer_cache, "embed_query", hashed_embedding)
+    monkeypatch.setattr(answer_cache, "get_corpus_version", lambda: "v1")
+    return cache
+
+
+def test_cache_is_off_by_default():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.delenv("ANSWER_CACHE_ENABLED", raising=False)
+        patch.setattr("dotenv.load_dotenv", lambda *args, **kwargs: False)
+        try:
+            assert importlib.reload(settings).ANSWER_CACHE_ENABLED is False
+        finally:
+            patch.undo()
+            importlib.reload(settings)
+
+
+@pytest.mark.parametrize("lookalike", LOOKALIKES)
+def test_lookalike_queries_with_different_intent_miss(enabled_cache, lookalike):
+    answer_cache.cache_answer(CACHED_QUESTION, "manager", response("Managers get 25 days."))
+    assert answer_cache.get_cached_answer(lookalike, "manager") is None
+
+
+def test_restated_question_hits(enabled_cache):
+    answer_cache.cache_answer(CACHED_QUESTION, "manager", response("Managers get 25 days."))
+    cached = answer_cache.get_cached_answer("what is the leave policy for managers", "manager")
+    assert cached["answer"] == "Managers get 25 days."
+    assert cached["cached"] is True
+
+
+def test_roles_do_not_share_answers(enabled_cache):
+    answer_cache.cache_answer(CACHED_QUESTION, "hr", response("HR view."))
+    assert answer_cache.get_cached_answer(CACHED_QUESTION, "employee") is None
+
+
+def test_lookups_below_the_threshold_miss():
+    cache = SemanticAnswerCache(threshold=0.99, capacity=4, ttl=3600)
+    stored = np.zeros(8)
+    stored[0] = 1.0
+    # Cosine 0.98 to the stored query: an "almost the same words" embedding
+    lookalike = np.zeros(8)
+    lookalike[0], lookalike[1] = 0.98, np.sqrt(1 - 0.98 ** 2)
+    cache.store("employee", stored.tolist(), response("stored"), "v1")
+
+    assert cache.lookup("employee", lookalike.tolist(), "v1") is None
+    assert cache.lookup("employee", stored.tolist(), "v1")[0]["answer"] == "stored"
@@ -0,0 +1,95 @@
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from utils.bm25_index import BM25Index, tokenize
+
+TEXTS = [
+    "Employees receive twenty vacation days per year.",
+    "Vacation requests must be approved by a manager before the vacation starts.",
+    "Parental leave lasts sixteen weeks for every parent.",
+    "Managers approve overtime and vacation schedules for their team.",
+    "The internal investigation process is confidential.",
+    "Remote work requests go through the employee's manager.",
+    "Sick leave does not reduce vacation days.",
+    "Performance reviews happen twice a year for employees and managers.",
+]
+
+
+def brute_force_scores(texts, query, k1=1.5, b=0.75):
+    """Textbook Okapi BM25, normalized by the query's maximum attainable score."""
+    docs = [Counter(tokenize(text)) for text in texts]
+    lengths = [sum(doc.values()) for doc in docs]
+    avg_length = sum(lengths) / len(lengths)
+    query_terms = Counter(token for token in tokenize(query) if any(token in doc for doc in docs))
+
+    scores = np.zeros(len(texts))
+    max_score = 0.0
+    for term, query_tf in query_terms.items():
+        df = sum(term in doc for doc in docs)
+        idf = math.log(1 + (len(texts) - df + 0.5) / (df + 0.5))
+        max_score += idf * (k1 + 1) * query_tf
+        for doc_id, doc in enumerate(docs):
+            tf = doc[term]
+            if tf:
+                scores[doc_id] += query_tf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc_id] / avg_length))
+    return scores / max_score if max_score else scores
+
+
+def expected(scores, allowed, top_k):
+    ranked = sorted((doc_id for doc_id in allowed if scores[doc_id] > 0), key=lambda doc_id: -scores[doc_id])
+    return ranked[:top_k]
+
+
+@pytest.mark.parametrize("query", [
+    "vacation days",
+    "manager approval for vacation vacation",
+    "parental leave weeks",
+    "employees managers year",
+])
+def test_scores_match_brute_force(query):
+    index = BM25Index(TEXTS)
+    reference = brute_force_scores(TEXTS, query)
+
+    doc_ids, scores = index.search(query, top_k=len(TEXTS))
+
+    assert list(doc_ids) == expected(reference, range(len(TEXTS)), len(TEXTS))
+    np.testing.assert_allclose(scores, reference[doc_ids], rtol=1e-5)
+
+
+def test_top_k_keeps_the_best_documents():
+    index = BM25Index(TEXTS)
+    reference = brute_force_scores(TEXTS, "vacation days")
+
+    doc_ids, _ = index.search("vacation days", top_k=2)
+
+    assert list(doc_ids) == expected(reference, range(len(TEXTS)), 2)
+
+
+def test_row_range_limits_candidates():
+    index = BM25Index(TEXTS)
+    reference = brute_force_scores(TEXTS, "vacation manager")
+
+    doc_ids, scores = index.search("vacation manager", top_k=10, row_start=2, row_stop=6)
+
+    assert list(doc_ids) == expected(reference, range(2, 6), 10)
+    # Scores are computed over the whole corpus, not re-weighted for the range
+    np.testing.assert_allclose(scores, reference[doc_ids], rtol=1e-5)
+
+
+def test_row_mask_limits_candidates():
+    index = BM25Index(TEXTS)
+    reference = brute_force_scores(TEXTS, "vacation leave")
+    row_mask = np.zeros(len(TEXTS), dtype=bool)
+    row_mask[[0, 2, 6]] = True
+
+    doc_ids, scores = index.search("vacation leave", top_k=10, row_mask=row_mask)
+
+    assert list(doc_ids) == expected(reference, [0, 2, 6], 10)
+    np.testing.assert_allclose(scores, reference[doc_ids], rtol=1e-5)
+
+
+def test_unknown_terms_return_nothing():
+    index = BM25Index(TEXTS)
+    doc_ids, scores = index.search("quantum chromodynamics", top_k=5)
+    assert len(doc_ids) == 0 and len(scores) == 0
@@ -0,0 +1,73 @@
+import pytest
+from utils import context_packer
+from utils.context_packer import pack_context, merge_neighbours
+
+SHARED = "Employees accrue vacation at a rate of one and a half days per month of service. "
+
+
+@pytest.fixture(autouse=True)
+def character_token_counts(monkeypatch):
+    # Deterministic offline token counts: characters / 4, as when the tokenizer is unavailable
+    monkeypatch.setattr(context_packer, "get_encoding", lambda: None)
+
+
+def chunk(content, source="handbook.txt", page=1, chunk_index=None, score=0.5):
+    return {
+        "content": content,
+        "metadata": {"source": source, "page": page, "chunk_index": chunk_index},
+        "final_score": score,
+    }
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap():
+    overlap = "the request must be approved by your manager"
+    first = chunk(f"Vacation requests are submitted in the portal and {overlap}", chunk_index=3, score=0.4)
+    second = chunk(f"{overlap} at least two weeks ahead.", chunk_index=4, score=0.9)
+
+    segments, merged = merge_neighbours([second, first])
+
+    assert merged == 1
+    assert len(segments) == 1
+    assert segments[0]["content"].count(overlap) == 1
+    assert segments[0]["content"].endswith("two weeks ahead.")
+    assert segments[0]["score"] == 0.9
+
+
+def test_non_adjacent_chunks_stay_separate():
+    segments, merged = merge_neighbours([chunk("a" * 40, chunk_index=1), chunk("b" * 40, chunk_index=3)])
+    assert merged == 0
+    assert len(segments) == 2
+
+
+def test_near_duplicate_keeps_the_better_scored_copy():
+    best = chunk(SHARED * 3, source="handbook.txt", score=0.9)
+    copy = chunk(SHARED * 3 + "See HR.", source="policy_digest.txt", score=0.3)
+    other = chunk("Parental leave lasts sixteen weeks and can be split into two blocks.", source="leave.txt", score=0.5)
+
+    context, stats = pack_context([copy, other, best], token_budget=10000)
+
+    assert stats["dropped_duplicates"] == 1
+    assert stats["segments"] == 2
+    assert "handbook.txt" in context and "policy_digest.txt" not in context
+
+
+def test_segments_past_the_budget_are_dropped_best_first():
+    chunks = [chunk(f"Policy {name}: " + word * 60, source=f"{name}.txt", score=score)
+              for name, word, score in [("low", "alpha ", 0.2), ("high", "bravo ", 0.9), ("mid", "charlie ", 0.5)]]
+    single = context_packer.count_tokens(f"[Source: mid.txt, Page: 1]\n{chunks[2]['content']}") + 1
+
+    context, stats = pack_context(chunks, token_budget=single * 2)
+
+    assert stats["dropped_over_budget"] == 1
+    assert stats["packed_tokens"] <= single * 2
+    assert context.index("high.txt") < context.index("mid.txt")
+    assert "low.txt" not in context
+
+
+def test_everything_fits_a_large_budget():
+    chunks = [chunk("Remote work needs manager approval.", source="a.txt"),
+              chunk("Sick leave does not reduce vacation days.", source="b.txt")]
+    context, stats = pack_context(chunks, token_budget=10000)
+    assert stats["segments"] == 2
+    assert stats["dropped_duplicates"] == stats["dropped_over_budget"] == 0
+    assert context.count("[Source:") == 2
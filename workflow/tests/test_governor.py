@@ -0,0 +1,181 @@
+import asyncio
+import time
+import httpx
+import openai
+import pytest
+from utils import governor as governor_module
+from utils.governor import ModelGovernor, CircuitOpenError
+from settings import CIRCUIT_COOLDOWN_SECONDS, CIRCUIT_FAILURE_THRESHOLD
+
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    # Each governed call is a single attempt, so failures reach the breaker without backoff sleeps
+    monkeypatch.setattr(governor_module, "GOVERNOR_MAX_RETRIES", 0)
+
+
+def connection_error() -> openai.APIConnectionError:
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.example.test/v1/chat"))
+
+
+def fail(error: Exception):
+    def call():
+        raise error
+    return call
+
+
+def half_open_governor() -> ModelGovernor:
+    """A governor whose circuit has cooled down, so the next call is the probe."""
+    governor = ModelGovernor("test-model")
+    governor.circuit = "open"
+    governor.opened_at = time.monotonic() - CIRCUIT_COOLDOWN_SECONDS - 1
+    return governor
+
+
+def test_cancelled_async_probe_frees_the_probe():
+    governor = half_open_governor()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(60)
+
+    async def scenario():
+        task = asyncio.create_task(governor.acall(hang))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await governor.acall(lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+    assert governor.circuit == "closed"
+    assert governor.in_flight == 0
+
+
+def test_abandoned_stream_probe_frees_the_probe():
+    governor = half_open_governor()
+    stream = governor.stream(lambda: iter(["a", "b", "c"]))
+    assert next(stream) == "a"
+    stream.close()
+
+    assert governor.call(lambda: "ok") == "ok"
+    assert governor.circuit == "closed"
+    assert governor.in_flight == 0
+
+
+def test_abandoned_async_stream_probe_frees_the_probe():
+    governor = half_open_governor()
+
+    async def chunks():
+        for chunk in ["a", "b", "c"]:
+            yield chunk
+
+    async def scenario():
+        stream = governor.astream(chunks)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        return await governor.acall(lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+    assert governor.circuit == "closed"
+
+
+def test_cancelled_non_probe_call_keeps_the_probe():
+    governor = half_open_governor()
+    assert governor._admit() is True
+    with pytest.raises(CircuitOpenError):
+        governor._admit()
+    # A call that was admitted while closed, cancelled now, must not free the probe
+    governor._clear_probe(False)
+    with pytest.raises(CircuitOpenError):
+        governor._admit()
+
+
+def test_consecutive_failures_open_the_circuit():
+    governor = ModelGovernor("test-model")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        with pytest.raises(openai.APIConnectionError):
+            governor.call(fail(connection_error()))
+    assert governor.circuit == "closed"
+
+    with pytest.raises(openai.APIConnectionError):
+        governor.call(fail(connection_error()))
+    assert governor.circuit == "open"
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        governor.call(lambda: calls.append(1))
+    assert calls == []
+
+
+def test_success_resets_the_failure_count():
+    governor = ModelGovernor("test-model")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        with pytest.raises(openai.APIConnectionError):
+            governor.call(fail(connection_error()))
+    governor.call(lambda: "ok")
+    with pytest.raises(openai.APIConnectionError):
+        governor.call(fail(connection_error()))
+    assert governor.circuit == "closed"
+
+
+def test_non_retryable_errors_do_not_open_the_circuit():
+    governor = ModelGovernor("test-model")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD + 1):
+        with pytest.raises(ValueError):
+            governor.call(fail(ValueError("bad request")))
+    assert governor.circuit == "closed"
+    assert governor.consecutive_failures == 0
+
+
+def test_open_circuit_waits_for_the_cooldown():
+    governor = ModelGovernor("test-model")
+    governor.circuit = "open"
+    governor.opened_at = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        governor.call(lambda: "ok")
+    assert governor.circuit == "open"
+
+
+def test_half_open_admits_a_single_probe():
+    governor = half_open_governor()
+    assert governor._admit() is True
+    assert governor.circuit == "half_open"
+    with pytest.raises(CircuitOpenError):
+        governor._admit()
+
+
+def test_successful_probe_closes_the_circuit():
+    governor = half_open_governor()
+    assert governor.call(lambda: "ok") == "ok"
+    assert governor.circuit == "closed"
+    assert governor.call(lambda: "again") == "again"
+
+
+def test_failed_probe_reopens_the_circuit():
+    governor = half_open_governor()
+    with pytest.raises(openai.APIConnectionError):
+        governor.call(fail(connection_error()))
+    assert governor.circuit == "open"
+    with pytest.raises(CircuitOpenError):
+        governor.call(lambda: "ok")
+
+
+def test_probe_with_non_retryable_error_frees_the_probe():
+    governor = half_open_governor()
+    with pytest.raises(ValueError):
+        governor.call(fail(ValueError("bad request")))
+    assert governor.circuit == "half_open"
+    assert governor.call(lambda: "ok") == "ok"
+    assert governor.circuit == "closed"
+
+
+def test_rate_limit_halves_the_limit():
+    governor = ModelGovernor("test-model")
+    limit = governor.limit
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.example.test/v1/chat"))
+    with pytest.raises(openai.RateLimitError):
+        governor.call(fail(openai.RateLimitError("rate limited", response=response, body=None)))
+    assert governor.limit == max(governor_module.GOVERNOR_MIN_LIMIT, limit * governor_module.RATE_LIMIT_BACKOFF)
+    assert governor.in_flight == 0
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+import pytest
+from utils.single_flight import SingleFlight
+
+
+def wait_for_flight(flights: SingleFlight, key) -> None:
+    deadline = time.monotonic() + 5
+    while key not in flights._flights:
+        assert time.monotonic() < deadline, "leader never started"
+        time.sleep(0.001)
+
+
+def test_follower_shares_the_leader_result():
+    flights = SingleFlight(max_wait=5)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"answer": "42"}
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault("leader", flights.run("key", work)))
+    leader.start()
+    wait_for_flight(flights, "key")
+
+    follower = threading.Thread(target=lambda: results.setdefault("follower", flights.run("key", work)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert calls == [1]
+    assert results["leader"] == results["follower"] == {"answer": "42"}
+    # Followers get a copy, so one request mutating its response can't affect another
+    assert results["leader"] is not results["follower"]
+    assert flights.stats()["coalesced"] == 1
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flights = SingleFlight(max_wait=5)
+    assert flights.run("a", lambda: 1) == 1
+    assert flights.run("b", lambda: 2) == 2
+    assert flights.stats()["leaders"] == 2
+
+
+def test_follower_that_times_out_runs_the_work_itself():
+    flights = SingleFlight(max_wait=0.05)
+    release = threading.Event()
+
+    leader = threading.Thread(target=lambda: flights.run("key", lambda: release.wait(5)))
+    leader.start()
+    wait_for_flight(flights, "key")
+
+    assert flights.run("key", lambda: "own result") == "own result"
+    assert flights.stats()["timeouts"] == 1
+    release.set()
+    leader.join(5)
+
+
+def test_leader_error_reaches_followers():
+    flights = SingleFlight(max_wait=5)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flights.run("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    wait_for_flight(flights, "key")
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ["upstream down", "upstream down"]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_follower_reruns_when_the_leader_is_cancelled():
+    flights = SingleFlight(max_wait=5)
+    calls = []
+
+    async def slow():
+        calls.append("leader")
+        await asyncio.sleep(60)
+
+    async def fast():
+        calls.append("follower")
+        return "follower result"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.arun("key", slow))
+        while "key" not in flights._flights:
+            await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.arun("key", fast))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "follower result"
+    assert calls == ["leader", "follower"]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_async_followers_share_the_leader_result():
+    flights = SingleFlight(max_wait=5)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["result"]
+
+    async def scenario():
+        return await asyncio.gather(*(flights.arun("key", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert all(result == ["result"] for result in results)
+    assert flights.stats()["coalesced"] == 4
@@ -0,0 +1,181 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import copy
+import threading
+import time
+import numpy as np
+from settings import ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_CAPACITY, ANSWER_CACHE_TTL
+from utils.embeddings import embed_query, aembed_query
+from utils.sparse_index import get_corpus_version, aget_corpus_version
+from utils.helpers import check_sensitive_content
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Only fully successful answers are reused; escalations and refusals always rerun
+CACHEABLE_STATUSES = {"success"}
+
+
+class RoleSlots:
+    """Fixed-capacity slots of normalized query embeddings and responses for one role."""
+
+    def __init__(self, capacity: int, dimension: int):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.responses: List[Optional[Dict[str, Any]]] = [None] * capacity
+
+
+class SemanticAnswerCache:
+    """
+    Final responses keyed by user role and query embedding. A new query reuses a stored
+    response when its cosine similarity to the cached query reaches the threshold.
+    Entries expire after ttl seconds, the least recently used entry is evicted when a
+    role's slots are full, and everything is dropped when the corpus version changes.
+    """
+
+    def __init__(self, threshold: float, capacity: int, ttl: float):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.corpus_version = None
+        self._roles: Dict[str, RoleSlots] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, corpus_version: str) -> None:
+        if corpus_version != self.corpus_version:
+            if self._roles:
+                self.invalidations += 1
+                logger.info("Corpus version changed (%s -> %s), clearing answer cache", self.corpus_version, corpus_version)
+            self._roles = {}
+            self.corpus_version = corpus_version
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, user_role: str, embedding: List[float], corpus_version: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(corpus_version)
+            slots = self._roles.get(user_role)
+            if slots is not None:
+                slots.valid &= slots.expires_at > now
+                scores = slots.vectors @ vector
+                scores[~slots.valid] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slots.last_used[best] = now
+                    self.hits += 1
+                    return copy.deepcopy(slots.responses[best]), float(scores[best])
+
+            self.misses += 1
+            return None
+
+    def store(self, user_role: str, embedding: List[float], response: Dict[str, Any], corpus_version: str) -> None:
+        if self.capacity <= 0:
+            return
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(corpus_version)
+            slots = self._roles.get(user_role)
+            if slots is None:
+                slots = self._roles[user_role] = RoleSlots(self.capacity, len(vector))
+
+            free = np.flatnonzero(~slots.valid)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(slots.last_used))
+                self.evictions += 1
+
+            slots.vectors[slot] = vector
+            slots.valid[slot] = True
+            slots.expires_at[slot] = now + self.ttl
+            slots.last_used[slot] = now
+            slots.responses[slot] = copy.deepcopy(response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._roles = {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": sum(int(slots.valid.sum()) for slots in self._roles.values()),
+                "capacity_per_role": self.capacity,
+                "threshold": self.threshold,
+                "corpus_version": self.corpus_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_answer_cache = SemanticAnswerCache(ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_CAPACITY, ANSWER_CACHE_TTL)
+
+
+def is_cacheable_query(query: str, user_role: str) -> bool:
+    # Mirrors escalation_check_node: sensitive questions from non-HR users must reach it,
+    # even when they closely resemble a cached non-sensitive one
+    return ANSWER_CACHE_ENABLED and (user_role == "hr" or not check_sensitive_content(query))
+
+
+def get_cached_answer(query: str, user_role: str) -> Optional[Dict[str, Any]]:
+    if not is_cacheable_query(query, user_role):
+        return None
+    return serve_cached_answer(_answer_cache.lookup(user_role, embed_query(query), get_corpus_version()), user_role)
+
+
+def serve_cached_answer(result: Optional[Tuple[Dict[str, Any], float]], user_role: str) -> Optional[Dict[str, Any]]:
+    if result is None:
+        metrics.increment("answer_cache_lookups", result="miss")
+        return None
+
+    response, similarity = result
+    metrics.increment("answer_cache_lookups", result="hit")
+    logger.debug("Serving cached answer for role %s (similarity=%.4f)", user_role, similarity)
+
+    response["timestamp"] = datetime.now().isoformat()
+    response["cached"] = True
+    return response
+
+
+def cache_answer(query: str, user_role: str, response: Dict[str, Any]) -> None:
+    if not is_cacheable_query(query, user_role) or response.get("status") not in CACHEABLE_STATUSES:
+        return
+    _answer_cache.store(user_role, embed_query(query), response, get_corpus_version())
+
+
+async def aget_cached_answer(query: str, user_role: str) -> Optional[Dict[str, Any]]:
+    if not is_cacheable_query(query, user_role):
+        return None
+    query_embedding = await aembed_query(query)
+    # The version lookup may reload the sparse index, which must not run on the event loop
+    return serve_cached_answer(_answer_cache.lookup(user_role, query_embedding, await aget_corpus_version()), user_role)
+
+
+async def acache_answer(query: str, user_role: str, response: Dict[str, Any]) -> None:
+    if not is_cacheable_query(query, user_role) or response.get("status") not in CACHEABLE_STATUSES:
+        return
+    query_embedding = await aembed_query(query)
+    _answer_cache.store(user_role, query_embedding, response, await aget_corpus_version())
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _answer_cache.stats()
@@ -0,0 +1,105 @@
+from typing import List, Optional, Tuple
+from collections import Counter
+import re
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an array-backed inverted index.
+
+    Postings for term t live in doc_ids[offsets[t]:offsets[t + 1]] (ascending doc ids)
+    with the matching precomputed BM25 contribution in weights, so a query only
+    gathers and sums the postings of its own terms.
+    """
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(texts)
+
+        term_ids = {}
+        posting_terms = []
+        posting_docs = []
+        posting_tfs = []
+        doc_lengths = np.zeros(self.num_docs, dtype=np.float32)
+
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc_id)
+                posting_tfs.append(tf)
+
+        self.term_ids = term_ids
+        terms = np.asarray(posting_terms, dtype=np.int32)
+        # Documents were visited in order, so a stable sort keeps each postings list sorted by doc id
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        self.doc_ids = np.asarray(posting_docs, dtype=np.int32)[order]
+        tfs = np.asarray(posting_tfs, dtype=np.float32)[order]
+
+        doc_freqs = np.bincount(terms, minlength=len(term_ids))
+        self.offsets = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=self.offsets[1:])
+
+        self.idf = np.log1p((self.num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+        avg_length = float(doc_lengths.mean()) if self.num_docs else 0.0
+        length_norm = k1 * (1 - b + b * doc_lengths / avg_length) if avg_length else np.full(self.num_docs, k1, dtype=np.float32)
+        self.weights = (self.idf[terms] * tfs * (k1 + 1) / (tfs + length_norm[self.doc_ids])).astype(np.float32)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.doc_ids.nbytes + self.weights.nbytes + self.offsets.nbytes + self.idf.nbytes
+
+    def search(self, query: str, top_k: int, row_start: int = 0, row_stop: Optional[int] = None,
+               row_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (doc_ids, scores) of the best top_k documents, best first. Only rows in
+        [row_start, row_stop), and in row_mask when given, are scored. Scores are divided
+        by the query's maximum attainable score so they fall in [0, 1).
+        """
+        row_stop = self.num_docs if row_stop is None else row_stop
+        query_terms = Counter(self.term_ids[token] for token in tokenize(query) if token in self.term_ids)
+
+        doc_slices = []
+        weight_slices = []
+        max_score = 0.0
+        for term_id, query_tf in query_terms.items():
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            postings = self.doc_ids[start:stop]
+            # Postings are sorted, so the role's row range is a contiguous slice
+            lo = start + np.searchsorted(postings, row_start)
+            hi = start + np.searchsorted(postings, row_stop)
+            doc_slices.append(self.doc_ids[lo:hi])
+            weight_slices.append(self.weights[lo:hi] * query_tf)
+            max_score += float(self.idf[term_id]) * (self.k1 + 1) * query_tf
+
+        if not doc_slices or max_score == 0.0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        doc_ids = np.concatenate(doc_slices)
+        weights = np.concatenate(weight_slices)
+        if row_mask is not None:
+            keep = row_mask[doc_ids]
+            doc_ids, weights = doc_ids[keep], weights[keep]
+
+        matched_docs, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights) / max_score
+
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return matched_docs[top], scores[top]
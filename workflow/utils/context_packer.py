@@ -0,0 +1,137 @@
+from typing import Dict, Any, List, Tuple
+from functools import lru_cache
+import re
+import tiktoken
+from settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD
+from utils.helpers import extract_text_from_chunks
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Shortest shared prefix/suffix treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+# Word n-gram size used to compare segments for near-duplicates
+SHINGLE_SIZE = 5
+# Rough characters per token, used when the tokenizer files can't be loaded
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    # Tokenizer of the gpt-4o / gpt-4.1 families used by the nodes; tiktoken fetches it on first use
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("Tokenizer unavailable (%s), estimating tokens as characters / %d", e.__class__.__name__, CHARS_PER_TOKEN)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def chunk_score(chunk: Dict[str, Any]) -> float:
+    return chunk.get("final_score", chunk.get("score", 0.0))
+
+
+def overlap_length(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for length in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+def merge_neighbours(chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Join chunks that are consecutive (same source and page, adjacent chunk_index) into one
+    segment, cutting the text the splitter repeated between them. A segment keeps the best
+    score of its chunks. Returns the segments and how many chunks were merged away.
+    """
+    groups: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    segments = []
+    for chunk in chunks:
+        metadata = chunk.get("metadata", {})
+        if metadata.get("chunk_index") is None:
+            segments.append({"content": chunk.get("content", ""), "metadata": metadata, "score": chunk_score(chunk)})
+        else:
+            groups.setdefault((metadata.get("source"), metadata.get("page")), []).append(chunk)
+
+    merged = 0
+    for group in groups.values():
+        group.sort(key=lambda chunk: chunk["metadata"]["chunk_index"])
+        current = None
+        for chunk in group:
+            index = chunk["metadata"]["chunk_index"]
+            if current is not None and index == current["last_index"] + 1:
+                content = chunk.get("content", "")
+                overlap = overlap_length(current["content"], content)
+                current["content"] += content[overlap:] if overlap else "\n" + content
+                current["score"] = max(current["score"], chunk_score(chunk))
+                current["last_index"] = index
+                merged += 1
+            else:
+                current = {"content": chunk.get("content", ""), "metadata": chunk["metadata"], "score": chunk_score(chunk), "last_index": index}
+                segments.append(current)
+
+    return segments, merged
+
+
+def shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def pack_context(chunks: List[Dict[str, Any]], token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the prompt context from retrieved chunks: merge overlapping neighbours, drop
+    segments whose text is mostly contained in a better-scored one, then add segments in
+    score order while they fit the token budget. Returns the context and packing stats.
+    """
+    segments, merged = merge_neighbours(chunks)
+    segments.sort(key=lambda segment: segment["score"], reverse=True)
+
+    kept = []
+    kept_shingles = []
+    duplicates = 0
+    over_budget = 0
+    tokens = 0
+    for segment in segments:
+        segment_shingles = shingles(segment["content"])
+        if any(len(segment_shingles & other) / max(1, min(len(segment_shingles), len(other))) >= dedup_threshold
+               for other in kept_shingles):
+            duplicates += 1
+            continue
+
+        metadata = segment["metadata"]
+        text = f"[Source: {metadata.get('source', 'Unknown')}, Page: {metadata.get('page', 'Unknown')}]\n{segment['content']}"
+        # Segments are joined by a blank line, roughly one token
+        segment_tokens = count_tokens(text) + 1
+        if tokens + segment_tokens > token_budget:
+            over_budget += 1
+            continue
+
+        kept.append(text)
+        kept_shingles.append(segment_shingles)
+        tokens += segment_tokens
+
+    context = "\n\n".join(kept)
+    packed_tokens = count_tokens(context)
+    original_tokens = count_tokens(extract_text_from_chunks(chunks))
+
+    return context, {
+        "chunks": len(chunks),
+        "segments": len(kept),
+        "merged_neighbours": merged,
+        "dropped_duplicates": duplicates,
+        "dropped_over_budget": over_budget,
+        "original_tokens": original_tokens,
+        "packed_tokens": packed_tokens,
+        "tokens_saved": max(0, original_tokens - packed_tokens),
+    }
@@ -0,0 +1,74 @@
+from typing import List, Tuple, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import threading
+import time
+from settings import EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_WORKERS
+from utils import metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class EmbeddingBatcher:
+    """
+    Collects single-text embedding requests from concurrent callers and sends them as one
+    batched call. A batch closes window_ms after its first request arrives or once it
+    holds max_batch texts; identical texts in a batch are embedded once. Batches are sent
+    from a small thread pool so the next one can fill while a call is in flight.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]],
+                 window_ms: float = EMBEDDING_BATCH_WINDOW_MS, max_batch: int = EMBEDDING_BATCH_MAX_SIZE,
+                 workers: int = EMBEDDING_BATCH_WORKERS):
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._senders = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding-batch")
+        self._collector = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the returned future resolves to its embedding."""
+        if self._collector is None:
+            with self._start_lock:
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name="embedding-batcher", daemon=True)
+                    self._collector.start()
+
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[str, Future, float]]) -> None:
+        sent_at = time.perf_counter()
+        for _, _, queued_at in batch:
+            metrics.observe("embedding_batch_queue_seconds", sent_at - queued_at, buckets=QUEUE_DELAY_BUCKETS)
+
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        metrics.observe("embedding_batch_size", len(texts), buckets=BATCH_SIZE_BUCKETS)
+
+        try:
+            vectors = dict(zip(texts, self.embed_batch(texts)))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for text, future, _ in batch:
+            future.set_result(vectors[text])
@@ -0,0 +1,99 @@
+from typing import List
+import asyncio
+import threading
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from settings import OPENAI_API_KEY, LLM_PROVIDER, EMBEDDING_MODEL, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL, EMBEDDING_BATCH_ENABLED
+from utils.cache import TTLCache
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.governor import get_governor
+from utils import metrics
+
+_embeddings_model = None
+_model_lock = threading.Lock()
+
+# (model, normalized query) -> embedding
+_query_cache = TTLCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+
+# Cache misses from concurrent requests are embedded together in one call
+_query_batcher = EmbeddingBatcher(lambda texts: get_embeddings_model().embed_documents(texts))
+
+
+class GovernedOpenAIEmbeddings(OpenAIEmbeddings):
+    """OpenAIEmbeddings whose API calls pass through the model's governor (embed_query goes via embed_documents)."""
+
+    def embed_documents(self, texts, chunk_size=None, **kwargs):
+        return get_governor(self.model).call(
+            lambda: super(GovernedOpenAIEmbeddings, self).embed_documents(texts, chunk_size=chunk_size, **kwargs)
+        )
+
+    async def aembed_documents(self, texts, chunk_size=None, **kwargs):
+        return await get_governor(self.model).acall(
+            lambda: super(GovernedOpenAIEmbeddings, self).aembed_documents(texts, chunk_size=chunk_size, **kwargs)
+        )
+
+
+def create_embeddings_model(model: str = EMBEDDING_MODEL) -> Embeddings:
+    """Governed embeddings client for the configured provider (hashed vectors when LLM_PROVIDER=fake)."""
+    if LLM_PROVIDER == "fake":
+        from utils.fake_provider import FakeEmbeddings
+        return FakeEmbeddings(model)
+    # Retries are the governor's job
+    return GovernedOpenAIEmbeddings(openai_api_key=OPENAI_API_KEY, model=model, max_retries=0)
+
+
+def get_embeddings_model() -> Embeddings:
+    global _embeddings_model
+
+    if _embeddings_model is None:
+        with _model_lock:
+            if _embeddings_model is None:
+                _embeddings_model = create_embeddings_model()
+    return _embeddings_model
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def embed_query(query: str) -> List[float]:
+    """
+    Embed a search query, reusing the cached vector for repeated questions. Only the cache
+    key is normalized; a miss embeds the query as written, so case in acronyms and names is kept.
+    """
+    key = (EMBEDDING_MODEL, normalize_query(query))
+
+    embedding = _query_cache.get(key)
+    if embedding is not None:
+        metrics.increment("embedding_cache_lookups", result="hit")
+        return embedding
+
+    metrics.increment("embedding_cache_lookups", result="miss")
+    if EMBEDDING_BATCH_ENABLED:
+        embedding = _query_batcher.submit(query).result()
+    else:
+        embedding = get_embeddings_model().embed_query(query)
+    _query_cache.set(key, embedding)
+    return embedding
+
+
+async def aembed_query(query: str) -> List[float]:
+    """Async embed_query sharing the same cache."""
+    key = (EMBEDDING_MODEL, normalize_query(query))
+
+    embedding = _query_cache.get(key)
+    if embedding is not None:
+        metrics.increment("embedding_cache_lookups", result="hit")
+        return embedding
+
+    metrics.increment("embedding_cache_lookups", result="miss")
+    if EMBEDDING_BATCH_ENABLED:
+        embedding = await asyncio.wrap_future(_query_batcher.submit(query))
+    else:
+        embedding = await get_embeddings_model().aembed_query(query)
+    _query_cache.set(key, embedding)
+    return embedding
+
+
+def query_cache_stats():
+    return _query_cache.stats()
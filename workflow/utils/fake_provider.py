@@ -0,0 +1,307 @@
+"""
+Offline stand-in for the OpenAI chat and embedding models (LLM_PROVIDER=fake).
+
+Embeddings are signed feature hashes of the text's words, so they are deterministic and
+texts sharing words land close together. Chat responses come from rules keyed on the
+prompt templates in utils/prompts.py, built from word overlap between the prompt fields.
+Every call sleeps for the configured latency and may raise an injected 429 or 500, and
+goes through the same governor as the real clients.
+"""
+from typing import Dict, Any, List, Optional, Tuple, Iterator, AsyncIterator
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+import httpx
+import numpy as np
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from settings import (
+    FAKE_EMBEDDING_DIMENSION, FAKE_LATENCY_MS, FAKE_LATENCY_JITTER_MS,
+    FAKE_RATE_LIMIT_RATE, FAKE_ERROR_RATE, FAKE_SEED
+)
+from utils.prompts import (
+    DOCUMENT_GRADER_PROMPT, QUERY_ENHANCER_PROMPT, ANSWER_GENERATION_PROMPT,
+    HALLUCINATION_CHECK_PROMPT, RELEVANCE_CHECK_PROMPT, FUSED_VERIFICATION_PROMPT
+)
+from utils.governor import get_governor
+from utils.instrumentation import record_llm_call
+from utils.context_packer import count_tokens
+from utils import metrics
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or our the this "
+    "to we what when where which who why will with you your".split()
+)
+
+# Word-overlap thresholds of the rules below
+GRADE_MIN_OVERLAP = 0.3
+GROUNDED_MIN_OVERLAP = 0.8
+RELEVANT_MIN_OVERLAP = 0.2
+# Sentences of context quoted in a generated answer
+ANSWER_SENTENCES = 2
+
+NO_ANSWER = "The provided context does not contain enough information to answer this question."
+
+_rng = random.Random(FAKE_SEED)
+_rng_lock = threading.Lock()
+
+
+# Injected latency and errors
+
+def _injected_error(status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "http://fake-provider/v1"))
+    error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+    return error_class(f"Injected {status} from the fake provider", response=response, body=None)
+
+
+def _draw_fault() -> Tuple[float, Optional[Exception]]:
+    with _rng_lock:
+        latency = max(0.0, FAKE_LATENCY_MS + _rng.uniform(-FAKE_LATENCY_JITTER_MS, FAKE_LATENCY_JITTER_MS)) / 1000
+        roll = _rng.random()
+
+    metrics.increment("fake_provider_calls")
+    if roll < FAKE_RATE_LIMIT_RATE:
+        status = 429
+    elif roll < FAKE_RATE_LIMIT_RATE + FAKE_ERROR_RATE:
+        status = 500
+    else:
+        return latency, None
+    metrics.increment("fake_provider_injected_errors", status=str(status))
+    return latency, _injected_error(status)
+
+
+def simulate_call() -> None:
+    latency, error = _draw_fault()
+    time.sleep(latency)
+    if error is not None:
+        raise error
+
+
+async def asimulate_call() -> None:
+    latency, error = _draw_fault()
+    await asyncio.sleep(latency)
+    if error is not None:
+        raise error
+
+
+# Embeddings
+
+def hashed_embedding(text: str, dimension: int = FAKE_EMBEDDING_DIMENSION) -> List[float]:
+    """Unit vector of signed word-hash counts; texts without words hash as a whole."""
+    vector = np.zeros(dimension)
+    for word in re.findall(r"\w+", text.lower()) or [text]:
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimension] += 1.0 if digest[4] & 1 else -1.0
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, model: str, dimension: int = FAKE_EMBEDDING_DIMENSION):
+        self.model = model
+        self.dimension = dimension
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        simulate_call()
+        return [hashed_embedding(text, self.dimension) for text in texts]
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        await asimulate_call()
+        return [hashed_embedding(text, self.dimension) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_governor(self.model).call(lambda: self._embed(texts))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await get_governor(self.model).acall(lambda: self._aembed(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+# Rule-based chat responses
+
+def content_words(text: str) -> List[str]:
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+def overlap(text: str, reference: str) -> float:
+    """Share of text's content words that also appear in reference."""
+    words = content_words(text)
+    if not words:
+        return 0.0
+    reference_words = set(content_words(reference))
+    return sum(word in reference_words for word in words) / len(words)
+
+
+def prompt_field(prompt: str, label: str, next_label: str) -> str:
+    match = re.search(rf"^{re.escape(label)}:(.*?)^{re.escape(next_label)}:", prompt, re.M | re.S)
+    return match.group(1).strip() if match else ""
+
+
+def grade_response(prompt: str) -> str:
+    question = prompt_field(prompt, "Question", "Documents")
+    documents = prompt_field(prompt, "Documents", "Instructions")
+    return "yes" if documents and overlap(question, documents) >= GRADE_MIN_OVERLAP else "no"
+
+
+def enhance_response(prompt: str) -> str:
+    query = prompt_field(prompt, "Original Query", "Instructions")
+    return f"{query.rstrip('?. ')} workplace policy"
+
+
+def generation_response(prompt: str) -> str:
+    """Quote the context sentences sharing the most words with the question, citing their source."""
+    question = prompt_field(prompt, "Question", "Available Context")
+    context = prompt_field(prompt, "Available Context", "Instructions")
+
+    sentences = []
+    for source, text in re.findall(r"\[Source: ([^\]]*)\]\n(.*?)(?=\n\n\[Source: |\Z)", context, re.S):
+        for sentence in re.split(r"(?<=[.!?])\s+", " ".join(text.split())):
+            score = overlap(question, sentence)
+            if score > 0:
+                sentences.append((score, sentence, source))
+
+    best = sorted(sentences, key=lambda item: item[0], reverse=True)[:ANSWER_SENTENCES]
+    if not best:
+        return NO_ANSWER
+    return " ".join(f"{sentence} (Source: {source})" for _, sentence, source in best)
+
+
+def is_grounded(answer: str, documents: str) -> bool:
+    return answer == NO_ANSWER or overlap(answer, documents) >= GROUNDED_MIN_OVERLAP
+
+
+def hallucination_response(prompt: str) -> str:
+    answer = prompt_field(prompt, "Generated Answer", "Source Documents")
+    documents = prompt_field(prompt, "Source Documents", "Instructions")
+    return "no" if is_grounded(answer, documents) else "yes"
+
+
+def relevance_response(prompt: str) -> str:
+    question = prompt_field(prompt, "Original Question", "Generated Answer")
+    answer = prompt_field(prompt, "Generated Answer", "Instructions")
+    return "yes" if overlap(question, answer) >= RELEVANT_MIN_OVERLAP else "no"
+
+
+def verification_response(prompt: str) -> Dict[str, Any]:
+    question = prompt_field(prompt, "Original Question", "Generated Answer")
+    answer = prompt_field(prompt, "Generated Answer", "Source Documents")
+    documents = prompt_field(prompt, "Source Documents", "Instructions")
+    grounded = is_grounded(answer, documents)
+    relevant = overlap(question, answer) >= RELEVANT_MIN_OVERLAP
+    return {
+        "hallucination": "no" if grounded else "yes",
+        "relevance": "yes" if relevant else "no",
+        "rationale": f"Answer is {'' if grounded else 'not '}supported by the documents and "
+                     f"{'addresses' if relevant else 'does not address'} the question.",
+    }
+
+
+# Prompts are recognised by the first line of their template
+TEXT_RULES = [
+    (DOCUMENT_GRADER_PROMPT, grade_response),
+    (QUERY_ENHANCER_PROMPT, enhance_response),
+    (ANSWER_GENERATION_PROMPT, generation_response),
+    (HALLUCINATION_CHECK_PROMPT, hallucination_response),
+    (RELEVANCE_CHECK_PROMPT, relevance_response),
+]
+
+
+def respond(prompt: str) -> str:
+    for template, rule in TEXT_RULES:
+        if prompt.startswith(template.split("\n", 1)[0]):
+            return rule(prompt)
+    return "ok"
+
+
+def respond_with_tool(prompt: str, tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Tool call for with_structured_output; only the fused verifier uses one."""
+    function = tool["function"]
+    fields = function.get("parameters", {}).get("properties", {})
+    values = verification_response(prompt) if prompt.startswith(FUSED_VERIFICATION_PROMPT.split("\n", 1)[0]) else {}
+    return {
+        "name": function["name"],
+        "args": {field: values.get(field, "") for field in fields},
+        "id": "call_" + hashlib.sha256(prompt.encode()).hexdigest()[:24],
+    }
+
+
+def prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(message.content for message in messages if isinstance(message.content, str))
+
+
+def usage(prompt: str, completion: str) -> Dict[str, int]:
+    input_tokens, output_tokens = count_tokens(prompt), count_tokens(completion)
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering from the rules above; supports streaming and structured output."""
+
+    model_name: str
+    temperature: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _message(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        prompt = prompt_text(messages)
+        if tools:
+            tool_call = respond_with_tool(prompt, tools[0])
+            return AIMessage(content="", tool_calls=[tool_call], usage_metadata=usage(prompt, str(tool_call["args"])))
+        content = respond(prompt)
+        return AIMessage(content=content, usage_metadata=usage(prompt, content))
+
+    def _result(self, messages: List[BaseMessage], tools=None) -> ChatResult:
+        message = self._message(messages, tools)
+        record_llm_call(self.model_name, message.usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[ChatGenerationChunk]:
+        prompt = prompt_text(messages)
+        content = respond(prompt)
+        for token in re.findall(r"\S+\s*", content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        # Token counts arrive on a final empty chunk, as with OpenAI's stream_usage
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage(prompt, content)))
+        record_llm_call(self.model_name, usage(prompt, content))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        def call():
+            simulate_call()
+            return self._result(messages, kwargs.get("tools"))
+        return get_governor(self.model_name).call(call)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        async def call():
+            await asimulate_call()
+            return self._result(messages, kwargs.get("tools"))
+        return await get_governor(self.model_name).acall(call)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        def chunks():
+            simulate_call()
+            yield from self._chunks(messages)
+        yield from get_governor(self.model_name).stream(chunks)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        async def chunks():
+            await asimulate_call()
+            for chunk in self._chunks(messages):
+                yield chunk
+        async for chunk in get_governor(self.model_name).astream(chunks):
+            yield chunk
@@ -0,0 +1,349 @@
+from typing import Dict, Any, Callable, Awaitable, Iterator, AsyncIterator, Optional, TypeVar
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import asyncio
+import random
+import threading
+import time
+import openai
+from settings import (
+    GOVERNOR_INITIAL_LIMIT, GOVERNOR_MIN_LIMIT, GOVERNOR_MAX_LIMIT, GOVERNOR_LATENCY_TOLERANCE,
+    GOVERNOR_ACQUIRE_TIMEOUT, GOVERNOR_MAX_RETRIES, GOVERNOR_BACKOFF_BASE, GOVERNOR_BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN_SECONDS
+)
+from utils import metrics
+from utils.instrumentation import record_retry
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Upstream failures worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+# Multiplicative decrease on a 429, and the gentler one when latency drifts above its baseline
+RATE_LIMIT_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.9
+# Weight of the newest sample in the latency baseline (exponential moving average)
+LATENCY_EWMA_ALPHA = 0.1
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while a model's circuit breaker is open."""
+
+
+class GovernorTimeoutError(Exception):
+    """No concurrency slot for the model became free within the acquire timeout."""
+
+
+class ModelGovernor:
+    """
+    Admission control for one upstream model.
+
+    Concurrency: at most `limit` calls in flight, adapted AIMD-style. Each success adds
+    1/limit (about +1 per round of calls); a 429 halves the limit and a latency above
+    GOVERNOR_LATENCY_TOLERANCE x the moving baseline trims it by 10%.
+
+    Retries: rate limits, timeouts, connection errors and 5xx are retried with full-jitter
+    exponential backoff, honouring Retry-After when the API sends it.
+
+    Circuit breaker: CIRCUIT_FAILURE_THRESHOLD consecutive retryable failures open the
+    circuit and calls fail fast for CIRCUIT_COOLDOWN_SECONDS; then one probe call is let
+    through, closing the circuit on success and reopening it on failure.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.limit = float(GOVERNOR_INITIAL_LIMIT)
+        self.in_flight = 0
+        self.latency_baseline: Optional[float] = None
+        self.circuit = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._waiters: "deque[Future]" = deque()
+        self._lock = threading.Lock()
+        self._export()
+
+    # Concurrency slots
+
+    def _capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self._capacity():
+            self.in_flight += 1
+            self._waiters.popleft().set_result(True)
+
+    def _enqueue(self) -> Optional[Future]:
+        with self._lock:
+            if self.in_flight < self._capacity() and not self._waiters:
+                self.in_flight += 1
+                return None
+            waiter = Future()
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: Future) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return
+        # Granted while we were giving up; hand the slot back
+        self.release()
+
+    def acquire(self) -> None:
+        start = time.perf_counter()
+        waiter = self._enqueue()
+        if waiter is not None:
+            try:
+                waiter.result(timeout=GOVERNOR_ACQUIRE_TIMEOUT)
+            except FutureTimeoutError:
+                self._abandon(waiter)
+                raise GovernorTimeoutError(f"No {self.model} slot free after {GOVERNOR_ACQUIRE_TIMEOUT}s")
+        metrics.observe("governor_wait_seconds", time.perf_counter() - start, model=self.model)
+
+    async def aacquire(self) -> None:
+        start = time.perf_counter()
+        waiter = self._enqueue()
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(waiter)), GOVERNOR_ACQUIRE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self._abandon(waiter)
+                raise GovernorTimeoutError(f"No {self.model} slot free after {GOVERNOR_ACQUIRE_TIMEOUT}s")
+            except BaseException:
+                self._abandon(waiter)
+                raise
+        metrics.observe("governor_wait_seconds", time.perf_counter() - start, model=self.model)
+
+    def _acquire_admitted(self, probe: bool) -> None:
+        try:
+            self.acquire()
+        except BaseException:
+            self._clear_probe(probe)
+            raise
+
+    async def _aacquire_admitted(self, probe: bool) -> None:
+        try:
+            await self.aacquire()
+        except BaseException:
+            self._clear_probe(probe)
+            raise
+
+    def _clear_probe(self, probe: bool) -> None:
+        # Only the call that holds the half-open probe may give it up
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+        metrics.set_gauge("governor_in_flight", self.in_flight, model=self.model)
+
+    # Circuit breaker and AIMD feedback
+
+    def _admit(self) -> bool:
+        """Let a call through or raise CircuitOpenError; True when the call is the half-open probe."""
+        with self._lock:
+            if self.circuit == "closed":
+                return False
+            if self.circuit == "open" and time.monotonic() - self.opened_at >= CIRCUIT_COOLDOWN_SECONDS:
+                self.circuit = "half_open"
+            if self.circuit == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        metrics.increment("governor_rejections", model=self.model)
+        raise CircuitOpenError(f"Circuit open for {self.model}, failing fast")
+
+    def _on_success(self, latency: Optional[float]) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probing = False
+            if self.circuit != "closed":
+                logger.info("Circuit closed for %s", self.model)
+            self.circuit = "closed"
+
+            self.limit = min(GOVERNOR_MAX_LIMIT, self.limit + 1 / self.limit)
+            if latency is not None:
+                if self.latency_baseline is not None and latency > GOVERNOR_LATENCY_TOLERANCE * self.latency_baseline:
+                    self.limit = max(GOVERNOR_MIN_LIMIT, self.limit * LATENCY_BACKOFF)
+                self.latency_baseline = latency if self.latency_baseline is None else (
+                    (1 - LATENCY_EWMA_ALPHA) * self.latency_baseline + LATENCY_EWMA_ALPHA * latency
+                )
+            self._wake()
+        self._export()
+
+    def _on_failure(self, error: Exception) -> None:
+        with self._lock:
+            if isinstance(error, openai.RateLimitError):
+                self.limit = max(GOVERNOR_MIN_LIMIT, self.limit * RATE_LIMIT_BACKOFF)
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.circuit == "half_open" or (self.circuit == "closed" and self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD):
+                self.circuit = "open"
+                self.opened_at = time.monotonic()
+                logger.warning("Circuit opened for %s after %d consecutive failures", self.model, self.consecutive_failures)
+        metrics.increment("governor_failures", model=self.model, error=type(error).__name__)
+        self._export()
+
+    def _export(self) -> None:
+        metrics.set_gauge("governor_limit", round(self.limit, 2), model=self.model)
+        metrics.set_gauge("governor_circuit_open", 0 if self.circuit == "closed" else 1, model=self.model)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None when the error must propagate."""
+        if not isinstance(error, RETRYABLE_ERRORS) or attempt >= GOVERNOR_MAX_RETRIES or self.circuit == "open":
+            return None
+        metrics.increment("governor_retries", model=self.model, error=type(error).__name__)
+        record_retry(self.model)
+
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(GOVERNOR_BACKOFF_MAX, float(retry_after))
+        except (TypeError, ValueError):
+            return random.uniform(0, min(GOVERNOR_BACKOFF_MAX, GOVERNOR_BACKOFF_BASE * 2 ** attempt))
+
+    # Governed calls
+
+    def call(self, func: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            probe = self._admit()
+            self._acquire_admitted(probe)
+            start = time.perf_counter()
+            try:
+                result = func()
+            except Exception as e:
+                self._handle_failure(e, probe)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._clear_probe(probe)
+                raise
+            else:
+                self._on_success(time.perf_counter() - start)
+                return result
+            finally:
+                self.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, func: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            probe = self._admit()
+            await self._aacquire_admitted(probe)
+            start = time.perf_counter()
+            try:
+                result = await func()
+            except Exception as e:
+                self._handle_failure(e, probe)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                # Cancelled mid-call: neither a success nor an upstream failure
+                self._clear_probe(probe)
+                raise
+            else:
+                self._on_success(time.perf_counter() - start)
+                return result
+            finally:
+                self.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stream(self, func: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """Governed streaming call; only failures before the first chunk are retried."""
+        attempt = 0
+        while True:
+            probe = self._admit()
+            self._acquire_admitted(probe)
+            started = False
+            try:
+                for chunk in func():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                self._handle_failure(e, probe)
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                # GeneratorExit when the consumer abandons the stream
+                self._clear_probe(probe)
+                raise
+            else:
+                # Streams vary in length, so they don't feed the latency baseline
+                self._on_success(None)
+                return
+            finally:
+                self.release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def astream(self, func: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        attempt = 0
+        while True:
+            probe = self._admit()
+            await self._aacquire_admitted(probe)
+            started = False
+            try:
+                async for chunk in func():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                self._handle_failure(e, probe)
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._clear_probe(probe)
+                raise
+            else:
+                self._on_success(None)
+                return
+            finally:
+                self.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _handle_failure(self, error: Exception, probe: bool) -> None:
+        if isinstance(error, RETRYABLE_ERRORS):
+            self._on_failure(error)
+        else:
+            # Not an upstream health problem; just free a half-open probe slot
+            self._clear_probe(probe)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "latency_baseline": round(self.latency_baseline, 4) if self.latency_baseline is not None else None,
+                "circuit": self.circuit,
+                "consecutive_failures": self.consecutive_failures,
+            }
+
+
+_governors: Dict[str, ModelGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(model: str) -> ModelGovernor:
+    governor = _governors.get(model)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.setdefault(model, ModelGovernor(model))
+    return governor
+
+
+def governor_stats() -> Dict[str, Any]:
+    return {model: governor.stats() for model, governor in list(_governors.items())}
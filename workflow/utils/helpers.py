@@ -1,7 +1,7 @@
 from typing import List, Dict, Any
 import re
 from datetime import datetime
-from settings import SENSITIVE_KEYWORDS
+from settings import SENSITIVE_KEYWORDS, DOCUMENT_ACCESS_LEVELS
 
 def parse_user_role(user_id: str) -> str:
     """
@@ -36,6 +36,20 @@ def get_authorized_access_levels(user_role: str) -> List[str]:
     return access_mapping.get(user_role, ["public"])
 
 
+# Source documents each role may retrieve, derived once from the ACL table in settings
+ROLE_ALLOWED_SOURCES = {
+    role: [
+        source for source, access_level in DOCUMENT_ACCESS_LEVELS.items()
+        if access_level in get_authorized_access_levels(role)
+    ]
+    for role in ["employee", "manager", "hr"]
+}
+
+
+def get_allowed_sources(user_role: str) -> List[str]:
+    return ROLE_ALLOWED_SOURCES.get(user_role, ROLE_ALLOWED_SOURCES["employee"])
+
+
 def extract_text_from_chunks(chunks: List[Dict[str, Any]]) -> str:
  
     texts = []
@@ -0,0 +1,160 @@
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import threading
+import time
+from utils import metrics
+
+# Set while a graph node runs; LLM calls, tokens and retries are attributed to it
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+# Set by request_trace() for requests that asked for a debug trace
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+# Label for LLM calls made outside any node
+NO_NODE = "none"
+
+
+class RequestTrace:
+    """Node spans, LLM usage and route decisions of one request, in execution order."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.routes: List[Dict[str, Any]] = []
+        self.notes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return round(time.perf_counter() - self.started, 4)
+
+    def add_span(self, node: str) -> Dict[str, Any]:
+        span = {"node": node, "start": self.elapsed(), "seconds": None,
+                "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "retries": 0}
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def add_route(self, edge: str, route: str) -> None:
+        with self._lock:
+            self.routes.append({"edge": edge, "route": route, "at": self.elapsed()})
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_seconds": self.elapsed(),
+                **self.notes,
+                "nodes": [dict(span) for span in self.spans],
+                "routes": list(self.routes),
+            }
+
+
+@contextmanager
+def request_trace():
+    """Collect a RequestTrace for the graph run inside this block (threads and tasks included)."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def annotate(key: str, value: Any) -> None:
+    """Attach a request-level fact (e.g. an answer cache hit) to the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.notes[key] = value
+
+
+def current_node() -> str:
+    span = _current_span.get()
+    return span["node"] if span is not None else NO_NODE
+
+
+def _start_span(node: str) -> Dict[str, Any]:
+    trace = _current_trace.get()
+    return trace.add_span(node) if trace is not None else {"node": node}
+
+
+def _finish_span(node: str, span: Dict[str, Any], start: float, error: Optional[Exception]) -> None:
+    seconds = time.perf_counter() - start
+    span["seconds"] = round(seconds, 4)
+    metrics.observe("node_latency_seconds", seconds, node=node)
+    metrics.increment("node_executions", node=node)
+    if error is not None:
+        span["error"] = type(error).__name__
+        metrics.increment("node_errors", node=node, error=type(error).__name__)
+
+
+def instrument_node(node: str, func: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """Wrap a graph node with latency, execution and error metrics and a trace span."""
+    @functools.wraps(func)
+    def wrapper(state):
+        span = _start_span(node)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        error = None
+        try:
+            return func(state)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            _finish_span(node, span, start, error)
+    return wrapper
+
+
+def ainstrument_node(node: str, afunc: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+    @functools.wraps(afunc)
+    async def wrapper(state):
+        span = _start_span(node)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        error = None
+        try:
+            return await afunc(state)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            _finish_span(node, span, start, error)
+    return wrapper
+
+
+def instrument_route(edge: str, func: Callable[[Dict[str, Any]], str]):
+    """Wrap a conditional edge so every routing decision is counted."""
+    @functools.wraps(func)
+    def wrapper(state):
+        route = func(state)
+        metrics.increment("route_decisions", edge=edge, route=route)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_route(edge, route)
+        return route
+    return wrapper
+
+
+def record_llm_call(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """Count one completed upstream chat call and its tokens against the running node."""
+    node = current_node()
+    prompt_tokens = (usage or {}).get("input_tokens", 0)
+    completion_tokens = (usage or {}).get("output_tokens", 0)
+    metrics.increment("llm_calls", node=node, model=model)
+    metrics.increment("llm_tokens", prompt_tokens, node=node, model=model, kind="prompt")
+    metrics.increment("llm_tokens", completion_tokens, node=node, model=model, kind="completion")
+
+    span = _current_span.get()
+    if span is not None and "llm_calls" in span:
+        span["llm_calls"] += 1
+        span["prompt_tokens"] += prompt_tokens
+        span["completion_tokens"] += completion_tokens
+
+
+def record_retry(model: str) -> None:
+    metrics.increment("upstream_retries", node=current_node(), model=model)
+    span = _current_span.get()
+    if span is not None and "retries" in span:
+        span["retries"] += 1
@@ -0,0 +1,169 @@
+from typing import Dict, Any, Optional
+import hashlib
+import sqlite3
+import threading
+import time
+import warnings
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+from pydantic import BaseModel
+from settings import LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES
+from utils.sparse_index import get_corpus_version
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# loads/dumps are marked beta and would warn on every cache hit; silence just those two
+warnings.filterwarnings("ignore", message=r"The function `(loads|dumps)` is in beta", category=LangChainBetaWarning)
+
+# How many inserts a process makes between checks of the size bound
+EVICTION_CHECK_INTERVAL = 100
+# Rows of another corpus version are purged once unused this long; during a rollout
+# processes on the old and new version share the file and each keeps its own rows warm
+STALE_VERSION_GRACE_SECONDS = 3600
+
+
+def serializable_generations(return_val: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    """
+    Structured-output responses carry the parsed Pydantic object in additional_kwargs;
+    store it as a dict, which the structured-output parser accepts on the way back.
+    """
+    generations = []
+    for generation in return_val:
+        message = getattr(generation, "message", None)
+        parsed = message.additional_kwargs.get("parsed") if message is not None else None
+        if isinstance(parsed, BaseModel):
+            message = message.model_copy(update={"additional_kwargs": {**message.additional_kwargs, "parsed": parsed.model_dump()}})
+            generation = generation.model_copy(update={"message": message})
+        generations.append(generation)
+    return generations
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain response cache in one SQLite file (WAL mode) shared by every worker process.
+
+    Keys hash the model configuration (LangChain's llm_string, which carries the model
+    name and call parameters) together with the fully rendered prompt. Rows record the
+    corpus version they were produced under and only match that version. Rows of other
+    versions are purged during eviction once they have gone unused for a while, and past
+    max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                corpus_version TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._corpus_version = None
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str, corpus_version: str) -> str:
+        # The version is part of the key so two versions never overwrite each other's rows
+        return hashlib.sha256(f"{corpus_version}\x00{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # Resolved before taking the lock: it may wait on a sparse index reload
+        corpus_version = get_corpus_version()
+        key = self._key(prompt, llm_string, corpus_version)
+
+        with self._lock:
+            self._corpus_version = corpus_version
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND corpus_version = ?", (key, corpus_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        metrics.increment("llm_cache_lookups", result="miss" if row is None else "hit")
+        return loads(row[0], allowed_objects="core") if row is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        corpus_version = get_corpus_version()
+        key = self._key(prompt, llm_string, corpus_version)
+        response = dumps(serializable_generations(return_val))
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, corpus_version, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, corpus_version, response, now, now)
+            )
+            self._inserts += 1
+            if self._inserts % EVICTION_CHECK_INTERVAL == 0:
+                self._evict(corpus_version, now)
+
+    def _evict(self, corpus_version: str, now: float) -> None:
+        stale = self._conn.execute(
+            "DELETE FROM llm_cache WHERE corpus_version != ? AND last_used < ?",
+            (corpus_version, now - STALE_VERSION_GRACE_SECONDS)
+        ).rowcount
+        if stale:
+            logger.info("Dropped %d cached LLM responses from other corpus versions", stale)
+
+        size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        excess = size - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+            metrics.increment("llm_cache_evictions", excess)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": size,
+                "max_entries": self.max_entries,
+                "corpus_version": self._corpus_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_llm_cache: Optional[SQLiteLLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> SQLiteLLMCache:
+    global _llm_cache
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = SQLiteLLMCache()
+    return _llm_cache
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    return _llm_cache.stats() if _llm_cache is not None else {}
@@ -0,0 +1,157 @@
+from typing import Dict, Any, Optional, Tuple
+import threading
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from langchain_openai import ChatOpenAI
+from settings import OPENAI_API_KEY, LLM_POOL_SIZE, LLM_KEEPALIVE_SECONDS, LLM_CACHE_ENABLED, LLM_PROVIDER
+from utils import metrics
+from utils.llm_cache import get_llm_cache
+from utils.governor import get_governor
+from utils.instrumentation import record_llm_call
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+_clients: Dict[Tuple[str, Optional[float]], BaseChatModel] = {}
+_clients_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+_stats = {"clients_created": 0, "http_requests": 0, "connections_opened": 0}
+_stats_lock = threading.Lock()
+
+
+def _record(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _trace_connection(event_name: str, info: Dict[str, Any]) -> None:
+    # httpcore only reports a TCP connect when the pool had no idle connection to reuse
+    if event_name == "connection.connect_tcp.complete":
+        _record("connections_opened")
+        metrics.increment("llm_http_connections_opened")
+
+
+async def _trace_connection_async(event_name: str, info: Dict[str, Any]) -> None:
+    _trace_connection(event_name, info)
+
+
+def _on_request(request: httpx.Request) -> None:
+    _record("http_requests")
+    metrics.increment("llm_http_requests")
+    request.extensions["trace"] = _trace_connection
+
+
+async def _on_request_async(request: httpx.Request) -> None:
+    _record("http_requests")
+    metrics.increment("llm_http_requests")
+    request.extensions["trace"] = _trace_connection_async
+
+
+def record_result(model: str, result: ChatResult) -> ChatResult:
+    record_llm_call(model, result.generations[0].message.usage_metadata if result.generations else None)
+    return result
+
+
+class GovernedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose API calls pass through the model's governor and are counted, with
+    their tokens, against the running node. Cache hits reach neither.
+    """
+
+    def _generate(self, *args, **kwargs):
+        return record_result(self.model_name, get_governor(self.model_name).call(
+            lambda: super(GovernedChatOpenAI, self)._generate(*args, **kwargs)
+        ))
+
+    async def _agenerate(self, *args, **kwargs):
+        return record_result(self.model_name, await get_governor(self.model_name).acall(
+            lambda: super(GovernedChatOpenAI, self)._agenerate(*args, **kwargs)
+        ))
+
+    def _stream(self, *args, **kwargs):
+        # With stream_usage the final chunk carries the token counts
+        usage = None
+        for chunk in get_governor(self.model_name).stream(lambda: super(GovernedChatOpenAI, self)._stream(*args, **kwargs)):
+            usage = chunk.message.usage_metadata or usage
+            yield chunk
+        record_llm_call(self.model_name, usage)
+
+    async def _astream(self, *args, **kwargs):
+        usage = None
+        async for chunk in get_governor(self.model_name).astream(lambda: super(GovernedChatOpenAI, self)._astream(*args, **kwargs)):
+            usage = chunk.message.usage_metadata or usage
+            yield chunk
+        record_llm_call(self.model_name, usage)
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_POOL_SIZE,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS
+    )
+
+
+def _http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    One sync and one async connection pool shared by every model client. Async connections
+    belong to the event loop that opened them, so async calls should come from one loop
+    (the server's).
+    """
+    global _http_client, _async_http_client
+
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_pool_limits(), timeout=60.0, event_hooks={"request": [_on_request]})
+        _async_http_client = httpx.AsyncClient(limits=_pool_limits(), timeout=60.0, event_hooks={"request": [_on_request_async]})
+    return _http_client, _async_http_client
+
+
+def get_llm(model: str, temperature: Optional[float] = None) -> BaseChatModel:
+    """
+    Process-wide chat client for (model, temperature), created on first use; the offline
+    FakeChatModel when LLM_PROVIDER=fake. Deterministic (temperature=0) clients answer
+    repeated prompts from the shared LLM cache.
+    """
+    key = (model, temperature)
+    llm = _clients.get(key)
+    if llm is not None:
+        return llm
+
+    with _clients_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            kwargs = {"temperature": temperature} if temperature is not None else {}
+            if temperature == 0 and LLM_CACHE_ENABLED:
+                kwargs["cache"] = get_llm_cache()
+            if LLM_PROVIDER == "fake":
+                # Imported here so the default provider never loads the stand-in
+                from utils.fake_provider import FakeChatModel
+                llm = FakeChatModel(model_name=model, **kwargs)
+            else:
+                http_client, async_http_client = _http_clients()
+                llm = GovernedChatOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    model=model,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                    max_retries=0,  # Retries are the governor's job
+                    stream_usage=True,
+                    **kwargs
+                )
+            _clients[key] = llm
+            _record("clients_created")
+            metrics.increment("llm_clients_created", model=model)
+            logger.info("Created %s LLM client %s (temperature=%s)", LLM_PROVIDER, model, temperature)
+    return llm
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["clients"] = len(_clients)
+    requests = stats["http_requests"]
+    stats["connection_reuse_ratio"] = round(1 - stats["connections_opened"] / requests, 4) if requests else 0.0
+    return stats
@@ -0,0 +1,135 @@
+"""
+Structured, non-blocking logging for the serving path.
+
+Loggers from get_logger() hand records to a bounded queue; a background QueueListener
+formats them and writes them to stdout, so a slow stdout never stalls a request. When
+the queue is full the record is dropped and counted in log_records_dropped. Every
+record carries the request ID set by request_context(). Time spent handing records
+off is accumulated in log_emit_seconds, next to log_records per level.
+"""
+from typing import Dict, Any, Optional, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from settings import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE
+from utils import metrics
+
+ROOT_LOGGER = "rag"
+
+# Client-supplied request IDs are only reused when they look like one
+REQUEST_ID_PATTERN = re.compile(r"^[\w.-]{1,64}$")
+
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Tag records logged inside this block (and its threads and tasks) with a request ID."""
+    if not request_id or not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex[:12]
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs in the calling thread before the handoff, while the request's context is visible
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        start = time.perf_counter()
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            metrics.increment("log_records_dropped")
+        except Exception:
+            self.handleError(record)
+        metrics.increment("log_emit_seconds", time.perf_counter() - start)
+        metrics.increment("log_records", level=record.levelname)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = extra_fields(record)
+        return super().format(record) + "".join(f" {key}={value}" for key, value in fields.items())
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+            **extra_fields(record),
+        }, default=str)
+
+
+def _stop_listener() -> None:
+    # Flushes queued records at exit; a full queue has no room for the stop sentinel
+    try:
+        _listener.stop()
+    except queue.Full:
+        pass
+
+
+def setup_logging() -> None:
+    """Attach the queue handler and start the background writer, once per process."""
+    global _listener
+
+    if _listener is not None:
+        return
+    with _setup_lock:
+        if _listener is not None:
+            return
+        writer = logging.StreamHandler(sys.stdout)
+        writer.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, writer)
+        _listener.start()
+        atexit.register(_stop_listener)
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
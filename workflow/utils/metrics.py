@@ -0,0 +1,132 @@
+from typing import Dict, Any, Tuple, List
+import re
+import threading
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+
+    def __init__(self):
+        self.value = 0.0
+
+    def increment(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+
+class Gauge:
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": dict(zip(self.buckets, self.bucket_counts)),
+        }
+
+
+_metrics: Dict[Tuple[str, Tuple], Any] = {}
+_lock = threading.Lock()
+
+
+def _get(kind, name: str, labels: Dict[str, Any], **kwargs):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    metric = _metrics.get(key)
+    if metric is None:
+        metric = _metrics.setdefault(key, kind(**kwargs))
+    return metric
+
+
+def increment(name: str, amount: float = 1.0, **labels) -> None:
+    with _lock:
+        _get(Counter, name, labels).increment(amount)
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    with _lock:
+        _get(Gauge, name, labels).set(value)
+
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels) -> None:
+    with _lock:
+        _get(Histogram, name, labels, buckets=buckets).observe(value)
+
+
+def _prometheus_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = [f'{_prometheus_name(key)}="{_escape_label_value(value)}"' for key, value in labels + extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format; counters get a _total suffix."""
+    lines: List[str] = []
+    declared = set()
+    with _lock:
+        for (name, labels), metric in sorted(_metrics.items(), key=lambda item: item[0]):
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            family = _prometheus_name(name)
+            if kind == "counter" and not family.endswith("_total"):
+                family += "_total"
+            if family not in declared:
+                declared.add(family)
+                lines.append(f"# TYPE {family} {kind}")
+
+            if kind != "histogram":
+                lines.append(f"{family}{_prometheus_labels(labels)} {metric.value}")
+                continue
+            # Buckets are stored per interval; Prometheus expects cumulative counts
+            cumulative = 0
+            for bound, count in zip(metric.buckets, metric.bucket_counts):
+                cumulative += count
+                lines.append(f"{family}_bucket{_prometheus_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{family}_bucket{_prometheus_labels(labels, (('le', '+Inf'),))} {metric.count}")
+            lines.append(f"{family}_sum{_prometheus_labels(labels)} {metric.sum}")
+            lines.append(f"{family}_count{_prometheus_labels(labels)} {metric.count}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, List[Dict[str, Any]]]:
+    """All metrics grouped by name, one entry per label set."""
+    with _lock:
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), metric in sorted(_metrics.items(), key=lambda item: item[0]):
+            result.setdefault(name, []).append({"labels": dict(labels), **metric.to_dict()})
+        return result
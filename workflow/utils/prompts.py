@@ -73,4 +73,19 @@ Instructions:
 - Check if the answer directly responds to what was asked
 - Consider if the answer is complete and helpful
 - Respond with only "yes" if relevant, "no" if not relevant , in same small letter and not a single word or phrase
-Addresses the question: """
\ No newline at end of file
+Addresses the question: """
+
+FUSED_VERIFICATION_PROMPT = """You are validating a generated answer before it is shown to the user.
+
+Original Question: {question}
+Generated Answer: {answer}
+Source Documents: {documents}
+
+Instructions:
+- hallucination: "yes" if the answer contains any claim, fact or detail not explicitly stated or directly inferrable from the source documents, "no" if it is accurate
+- relevance: "yes" if the answer directly and helpfully responds to the question, "no" if it does not
+- Use lowercase "yes" or "no" only{rationale_instruction}
+"""
+
+FUSED_VERIFICATION_RATIONALE_INSTRUCTION = """
+- rationale: one or two sentences explaining both verdicts"""
@@ -0,0 +1,115 @@
+from typing import Dict, Any, Callable, Awaitable, Hashable, Tuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import asyncio
+import copy
+import threading
+from settings import SINGLE_FLIGHT_MAX_WAIT
+from utils import metrics
+from utils.instrumentation import annotate
+
+
+class LeaderAbandoned(Exception):
+    """The request executing a flight was cancelled before it produced a result."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution. The first caller (the
+    leader) runs the work; callers arriving while it is in flight wait up to max_wait
+    seconds for its result and receive a deep copy. A follower whose wait runs out, or
+    whose leader was cancelled, runs the work itself.
+
+    Flights are concurrent.futures.Future objects behind a thread lock, so threaded callers
+    (run) and event-loop callers (arun) can share the same flight.
+    """
+
+    def __init__(self, max_wait: float = SINGLE_FLIGHT_MAX_WAIT):
+        self.max_wait = max_wait
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = self._flights[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def _record(self, outcome: str) -> None:
+        with self._lock:
+            if outcome == "coalesced":
+                self.coalesced += 1
+            elif outcome == "timeout":
+                self.timeouts += 1
+        metrics.increment("single_flight_requests", outcome=outcome)
+        annotate("single_flight", outcome)
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                result = future.result(timeout=self.max_wait)
+                self._record("coalesced")
+                return copy.deepcopy(result)
+            except FutureTimeoutError:
+                self._record("timeout")
+                return func()
+            except LeaderAbandoned:
+                return func()
+
+        self._record("leader")
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else LeaderAbandoned())
+            raise
+        finally:
+            self._finish(key, future)
+
+    async def arun(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                # shield: a follower timing out must not cancel the leader's flight
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.max_wait)
+                self._record("coalesced")
+                return copy.deepcopy(result)
+            except asyncio.TimeoutError:
+                self._record("timeout")
+                return await func()
+            except LeaderAbandoned:
+                return await func()
+
+        self._record("leader")
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            # Cancellation (e.g. a client disconnect) sends followers off to run it themselves
+            future.set_exception(e if isinstance(e, Exception) else LeaderAbandoned())
+            raise
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "max_wait": self.max_wait,
+            }
@@ -0,0 +1,273 @@
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import os
+import pickle
+import threading
+import time
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from settings import SPARSE_INDEX_DIR, SPARSE_INDEX_RELOAD_INTERVAL, SPARSE_RETRIEVER
+from utils.helpers import ROLE_ALLOWED_SOURCES, get_allowed_sources
+from utils.bm25_index import BM25Index
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Single artifact written by the ingestion pipeline; bump the format when its layout changes
+SPARSE_INDEX_PATH = os.path.join(SPARSE_INDEX_DIR, "sparse_index.pkl")
+SPARSE_INDEX_FORMAT = 1
+
+
+class RolePartition:
+    """
+    Corpus rows one role may search, with the matching TF-IDF rows. The rows are
+    [row_start, row_stop) of the full corpus, narrowed by row_mask when they are
+    not contiguous.
+    """
+
+    def __init__(self, docs: List[Dict[str, Any]], matrix, is_view: bool,
+                 row_start: int, row_stop: int, row_mask: Optional[np.ndarray] = None):
+        self.docs = docs
+        self.matrix = matrix
+        self.is_view = is_view
+        self.row_start = row_start
+        self.row_stop = row_stop
+        self.row_mask = row_mask
+
+
+class SparseIndex:
+    """Immutable snapshot of the sparse retrieval artifacts, shared by all requests."""
+
+    def __init__(self, vectorizer, corpus_docs: List[Dict[str, Any]], tfidf_matrix,
+                 chunk_vectors: Dict[str, np.ndarray], stamp: Tuple, load_seconds: float,
+                 corpus_version: str):
+        self.corpus_version = corpus_version
+        self.vectorizer = vectorizer
+        self.chunk_vectors = chunk_vectors
+        self.stamp = stamp
+        self.load_seconds = load_seconds
+        self.corpus_docs, self.tfidf_matrix = order_rows_by_access(corpus_docs, tfidf_matrix)
+        self.partitions = {
+            role: build_role_partition(self.corpus_docs, self.tfidf_matrix, role)
+            for role in ROLE_ALLOWED_SOURCES
+        }
+        self.bm25 = BM25Index([doc["content"] for doc in self.corpus_docs]) if SPARSE_RETRIEVER == "bm25" else None
+
+    def partition(self, user_role: str) -> RolePartition:
+        return self.partitions.get(user_role, self.partitions["employee"])
+
+    @property
+    def memory_bytes(self) -> int:
+        matrix = self.tfidf_matrix
+        matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        # Views share the full matrix's buffers; only materialized partitions add memory
+        for partition in self.partitions.values():
+            if not partition.is_view:
+                matrix_bytes += partition.matrix.data.nbytes + partition.matrix.indices.nbytes + partition.matrix.indptr.nbytes
+        vector_bytes = sum(vector.nbytes for vector in self.chunk_vectors.values())
+        bm25_bytes = self.bm25.memory_bytes if self.bm25 is not None else 0
+        return matrix_bytes + vector_bytes + bm25_bytes
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "corpus_version": self.corpus_version,
+            "documents": len(self.corpus_docs),
+            "features": self.tfidf_matrix.shape[1],
+            "chunk_vectors": len(self.chunk_vectors),
+            "role_documents": {role: len(partition.docs) for role, partition in self.partitions.items()},
+            "load_seconds": round(self.load_seconds, 3),
+            "memory_mb": round(self.memory_bytes / (1024 * 1024), 2),
+        }
+
+
+def order_rows_by_access(corpus_docs: List[Dict[str, Any]], tfidf_matrix) -> Tuple[List[Dict[str, Any]], Any]:
+    """
+    Reorder rows so the most widely readable sources come first. With nested access
+    levels (employee within manager within hr) every role's rows become a prefix.
+    """
+    def readers(doc):
+        source = doc["metadata"].get("source", "")
+        return sum(source in sources for sources in ROLE_ALLOWED_SOURCES.values())
+
+    order = sorted(range(len(corpus_docs)), key=lambda idx: -readers(corpus_docs[idx]))
+    if order == list(range(len(corpus_docs))):
+        return corpus_docs, tfidf_matrix
+
+    return [corpus_docs[idx] for idx in order], tfidf_matrix[order]
+
+
+def row_range_view(matrix, start: int, stop: int):
+    """CSR matrix over rows [start, stop) sharing the data and indices buffers of matrix."""
+    indptr = matrix.indptr[start:stop + 1]
+    if start:
+        indptr = indptr - indptr[0]
+    data = matrix.data[matrix.indptr[start]:matrix.indptr[stop]]
+    indices = matrix.indices[matrix.indptr[start]:matrix.indptr[stop]]
+    return csr_matrix((data, indices, indptr), shape=(stop - start, matrix.shape[1]), copy=False)
+
+
+def build_role_partition(corpus_docs: List[Dict[str, Any]], tfidf_matrix, user_role: str) -> RolePartition:
+    allowed_sources = set(get_allowed_sources(user_role))
+    rows = [idx for idx, doc in enumerate(corpus_docs) if doc["metadata"].get("source", "") in allowed_sources]
+
+    if rows and rows == list(range(rows[0], rows[-1] + 1)):
+        start, stop = rows[0], rows[-1] + 1
+        return RolePartition(corpus_docs[start:stop], row_range_view(tfidf_matrix, start, stop), True, start, stop)
+
+    # Non-contiguous access pattern: materialize the rows once here instead of per request
+    row_mask = np.zeros(len(corpus_docs), dtype=bool)
+    row_mask[rows] = True
+    return RolePartition([corpus_docs[idx] for idx in rows], tfidf_matrix[rows], False, 0, len(corpus_docs), row_mask)
+
+
+_current_index: Optional[SparseIndex] = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+# Set once the missing artifact has been reported, so requests don't repeat the warning
+_missing_reported = False
+
+
+def artifact_stamp() -> Optional[Tuple]:
+    """(mtime, size) of the artifact; cheap enough to call on the request path."""
+    try:
+        stat = os.stat(SPARSE_INDEX_PATH)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def build_sparse_index(chunks: List[Dict[str, Any]], corpus_version: str) -> Dict[str, Any]:
+    """
+    Build the sparse index artifact from ingested chunks of the form
+    {"id", "content", "embedding", "metadata"}.
+    """
+    corpus_texts = []
+    corpus_docs = []
+    chunk_ids = []
+    chunk_vectors = []
+
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        corpus_texts.append(chunk["content"].lower())
+        corpus_docs.append({
+            "content": chunk["content"],
+            "metadata": {
+                "source": metadata.get("source"),
+                "page": metadata.get("page"),
+                "document_type": metadata.get("document_type"),
+                "department": metadata.get("department"),
+                "chunk_id": chunk["id"],
+                "chunk_index": metadata.get("chunk_index"),
+            }
+        })
+        if chunk.get("embedding") is not None:
+            chunk_ids.append(chunk["id"])
+            chunk_vectors.append(chunk["embedding"])
+
+    tfidf_vectorizer = TfidfVectorizer(
+        max_features=10000,
+        ngram_range=(1, 3),
+        stop_words='english',
+        min_df=2,
+        max_df=0.95,
+        sublinear_tf=True,
+        norm='l2'
+    )
+    tfidf_matrix = tfidf_vectorizer.fit_transform(corpus_texts).tocsr()
+
+    return {
+        "format": SPARSE_INDEX_FORMAT,
+        "corpus_version": corpus_version,
+        "created_at": time.time(),
+        "vectorizer": tfidf_vectorizer,
+        "tfidf_matrix": tfidf_matrix,
+        "corpus_docs": corpus_docs,
+        "chunk_ids": chunk_ids,
+        # Stored chunk vectors let RRF score sparse-only hits without re-embedding them
+        "chunk_vectors": np.asarray(chunk_vectors, dtype=np.float32),
+    }
+
+
+def write_sparse_index(artifact: Dict[str, Any], path: str = SPARSE_INDEX_PATH) -> None:
+    """Write the artifact next to its final path and swap it in with one atomic rename."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_sparse_index() -> Optional[SparseIndex]:
+    """Read the artifact into a new SparseIndex without touching the live one."""
+    stamp = artifact_stamp()
+    if stamp is None:
+        return None
+
+    start = time.perf_counter()
+
+    with open(SPARSE_INDEX_PATH, 'rb') as f:
+        artifact = pickle.load(f)
+
+    if artifact.get("format") != SPARSE_INDEX_FORMAT:
+        raise RuntimeError(f"unsupported sparse index format {artifact.get('format')}, re-run ingestion")
+
+    chunk_vectors = dict(zip(artifact["chunk_ids"], artifact["chunk_vectors"]))
+
+    sparse_index = SparseIndex(
+        artifact["vectorizer"], artifact["corpus_docs"], artifact["tfidf_matrix"].tocsr(),
+        chunk_vectors, stamp, 0.0, artifact["corpus_version"]
+    )
+    sparse_index.load_seconds = time.perf_counter() - start
+    return sparse_index
+
+
+def get_sparse_index() -> Optional[SparseIndex]:
+    """
+    Return the process-wide sparse index, reloading it when the artifact on disk changes.
+    Callers keep the returned snapshot for the whole request, so a reload never affects
+    a search that is already running.
+    """
+    global _current_index, _last_check, _missing_reported
+
+    now = time.monotonic()
+    if _current_index is not None and now - _last_check < SPARSE_INDEX_RELOAD_INTERVAL:
+        return _current_index
+
+    with _reload_lock:
+        if _current_index is not None and now - _last_check < SPARSE_INDEX_RELOAD_INTERVAL:
+            return _current_index
+        _last_check = now
+
+        stamp = artifact_stamp()
+        if stamp is None and _current_index is None and not _missing_reported:
+            _missing_reported = True
+            logger.warning("Sparse index %s not found, hybrid retrieval is dense-only until the ingestion "
+                           "pipeline builds it; /api/ready reports not ready meanwhile", SPARSE_INDEX_PATH)
+        if stamp is None or (_current_index is not None and stamp == _current_index.stamp):
+            return _current_index
+
+        try:
+            new_index = load_sparse_index()
+        except Exception as e:
+            logger.warning("Keeping current sparse index, reload failed: %s", e)
+            return _current_index
+
+        if new_index is not None:
+            action = "Reloaded" if _current_index is not None else "Loaded"
+            _current_index = new_index
+            logger.info("%s sparse index: %s", action, new_index.describe())
+
+        return _current_index
+
+
+def get_corpus_version() -> str:
+    """Version of the ingested corpus currently served, shared with the dense index."""
+    sparse_index = get_sparse_index()
+    return sparse_index.corpus_version if sparse_index is not None else "none"
+
+
+async def aget_corpus_version() -> str:
+    """get_corpus_version for the event loop: a due reload check, and any reload, runs in a worker thread."""
+    if _current_index is not None and time.monotonic() - _last_check < SPARSE_INDEX_RELOAD_INTERVAL:
+        return _current_index.corpus_version
+    return await asyncio.to_thread(get_corpus_version)
@@ -0,0 +1,417 @@
+from typing import Dict, Any, List, Optional
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from settings import (
+    PINECONE_API_KEY, PINECONE_INDEX_NAME, PINECONE_POOL_SIZE, VECTOR_STORE_BACKEND, VECTOR_STORE_WORKERS,
+    LOCAL_VECTOR_STORE_DIR, VECTOR_STORE_IVF_LISTS, VECTOR_STORE_IVF_NPROBE
+)
+from utils import metrics
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Blocking queries from the async request path run here rather than in the event loop's
+# small default executor, which every to_thread call in the process shares
+_query_executor = ThreadPoolExecutor(max_workers=VECTOR_STORE_WORKERS, thread_name_prefix="vector-query")
+
+
+class VectorStore(ABC):
+    """
+    Dense vector backend used by both ingestion and retrieval.
+
+    Matches are plain dicts: {"id", "score", "metadata", "values"}; "values" is only
+    filled when include_values is requested.
+    """
+
+    def warm_up(self) -> None:
+        """Open connections or map files ahead of the first query."""
+
+    def query(self, vector: List[float], top_k: int, allowed_sources: Optional[List[str]] = None,
+              include_values: bool = False) -> List[Dict[str, Any]]:
+        return self.query_batch([vector], top_k, allowed_sources, include_values)[0]
+
+    async def aquery(self, vector: List[float], top_k: int, allowed_sources: Optional[List[str]] = None,
+                     include_values: bool = False) -> List[Dict[str, Any]]:
+        """Awaitable query for the async request path; runs off the event loop on the query executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            _query_executor, contextvars.copy_context().run, self.query, vector, top_k, allowed_sources, include_values
+        )
+
+    @abstractmethod
+    def query_batch(self, vectors: List[List[float]], top_k: int, allowed_sources: Optional[List[str]] = None,
+                    include_values: bool = False) -> List[List[Dict[str, Any]]]:
+        """One list of matches per query vector, best first."""
+
+    @abstractmethod
+    def replace_all(self, records: List[Dict[str, Any]], version: Optional[str] = None) -> None:
+        """
+        Replace the whole collection with records of the form {"id", "values", "metadata"}.
+        The index dimension is the records' vector length; see record_dimension().
+        """
+
+
+def record_dimension(records: List[Dict[str, Any]]) -> int:
+    """Vector length shared by all records; raises ValueError when it is missing or inconsistent."""
+    if not records:
+        raise ValueError("No records to store")
+    dimension = len(records[0]["values"])
+    for record in records:
+        if len(record["values"]) != dimension:
+            raise ValueError(f"Record {record['id']} has a {len(record['values'])}-dimensional vector, expected {dimension}")
+    return dimension
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    One lazily created Pinecone client and index handle per process, shared by every
+    request thread so the HTTP connection pool and TLS sessions are reused.
+    """
+
+    def __init__(self, api_key: str = PINECONE_API_KEY, index_name: str = PINECONE_INDEX_NAME,
+                 pool_size: int = PINECONE_POOL_SIZE):
+        self.api_key = api_key
+        self.index_name = index_name
+        self.pool_size = pool_size
+        self._pc = None
+        self._index_handle = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        if self._pc is None:
+            with self._lock:
+                if self._pc is None:
+                    from pinecone import Pinecone
+                    start = time.perf_counter()
+                    self._pc = Pinecone(api_key=self.api_key, connection_pool_maxsize=self.pool_size)
+                    elapsed = time.perf_counter() - start
+                    metrics.observe("vector_store_connect_seconds", elapsed, stage="client")
+                    metrics.increment("vector_store_clients_created", backend="pinecone")
+                    logger.info("Created Pinecone client in %.0fms (pool size %d)", elapsed * 1000, self.pool_size)
+        return self._pc
+
+    def _index(self):
+        if self._index_handle is None:
+            pc = self._client()
+            with self._lock:
+                if self._index_handle is None:
+                    # Resolving the index host is a control-plane round-trip; do it once
+                    start = time.perf_counter()
+                    self._index_handle = pc.Index(self.index_name)
+                    elapsed = time.perf_counter() - start
+                    metrics.observe("vector_store_connect_seconds", elapsed, stage="index")
+                    logger.info("Opened Pinecone index %r in %.0fms", self.index_name, elapsed * 1000)
+        return self._index_handle
+
+    def warm_up(self):
+        self._index()
+
+    @staticmethod
+    def _to_match(match, include_values: bool) -> Dict[str, Any]:
+        return {
+            "id": match.id,
+            "score": match.score,
+            "metadata": match.metadata or {},
+            "values": list(match.values) if include_values and match.values else None,
+        }
+
+    def query_batch(self, vectors, top_k, allowed_sources=None, include_values=False):
+        index = self._index()
+        metadata_filter = {"source": {"$in": allowed_sources}} if allowed_sources is not None else None
+
+        results = []
+        for vector in vectors:
+            search_results = index.query(
+                vector=list(vector),
+                top_k=top_k,
+                include_metadata=True,
+                include_values=include_values,
+                filter=metadata_filter
+            )
+            results.append([self._to_match(match, include_values) for match in search_results.matches])
+        return results
+
+    def replace_all(self, records, version=None):
+        from pinecone import ServerlessSpec, CloudProvider, AwsRegion, Metric
+
+        # Validated before the existing index is deleted
+        dimension = record_dimension(records)
+        pc = self._client()
+        # The index is recreated on a new host, so the cached handle must not be reused
+        with self._lock:
+            self._index_handle = None
+
+        if pc.has_index(self.index_name):
+            pc.delete_index(self.index_name)
+            logger.info("Deleted existing index: %s", self.index_name)
+
+        logger.info("Creating new Pinecone index: %s", self.index_name)
+        pc.create_index(
+            name=self.index_name,
+            dimension=dimension,
+            metric=Metric.COSINE,
+            spec=ServerlessSpec(
+                cloud=CloudProvider.AWS,
+                region=AwsRegion.US_EAST_1
+            )
+        )
+        index = self._index()
+
+        batch_size = 100
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i + batch_size]
+            index.upsert(vectors=batch)
+            logger.info("Uploaded batch %d/%d", i // batch_size + 1, (len(records) + batch_size - 1) // batch_size)
+
+
+class LocalSnapshot:
+    """One immutable, memory-mapped version of the local store."""
+
+    def __init__(self, directory: str, manifest: Dict[str, Any]):
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.vectors = np.load(os.path.join(directory, manifest["vectors_file"]), mmap_mode="r")
+
+        with np.load(os.path.join(directory, manifest["columns_file"])) as columns:
+            self.source_codes = columns["source_codes"]
+            self.ivf_centroids = columns["ivf_centroids"] if "ivf_centroids" in columns else None
+            self.ivf_offsets = columns["ivf_offsets"] if "ivf_offsets" in columns else None
+
+        with open(os.path.join(directory, manifest["records_file"]), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.metadata = records["metadata"]
+        self.sources = records["sources"]
+
+    def row_mask(self, allowed_sources: Optional[List[str]]) -> Optional[np.ndarray]:
+        if allowed_sources is None:
+            return None
+        allowed = set(allowed_sources)
+        allowed_codes = np.array([source in allowed for source in self.sources], dtype=bool)
+        return allowed_codes[self.source_codes]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Float32 matrix on disk, memory-mapped for queries. Vectors are stored L2-normalized
+    so cosine similarity is a plain matmul. Exact search scores every row in blocks;
+    when the collection was written with IVF lists, queries only score the rows of the
+    VECTOR_STORE_IVF_NPROBE closest lists.
+    """
+
+    MANIFEST = "manifest.json"
+    BLOCK_ROWS = 65536
+
+    def __init__(self, directory: str = LOCAL_VECTOR_STORE_DIR, ivf_lists: int = VECTOR_STORE_IVF_LISTS,
+                 nprobe: int = VECTOR_STORE_IVF_NPROBE):
+        self.directory = directory
+        self.ivf_lists = ivf_lists
+        self.nprobe = nprobe
+        self._snapshot = None
+        self._manifest_stamp = None
+        self._lock = threading.Lock()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, self.MANIFEST)
+
+    def snapshot(self) -> Optional[LocalSnapshot]:
+        try:
+            stat = os.stat(self._manifest_path())
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._manifest_stamp:
+            return self._snapshot
+
+        with self._lock:
+            if stamp != self._manifest_stamp:
+                start = time.perf_counter()
+                with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self._snapshot = LocalSnapshot(self.directory, manifest)
+                self._manifest_stamp = stamp
+                metrics.observe("vector_store_connect_seconds", time.perf_counter() - start, stage="local_load")
+                logger.info("Loaded local vector store %s: %d vectors", self._snapshot.version, len(self._snapshot.ids))
+        return self._snapshot
+
+    def warm_up(self):
+        self.snapshot()
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _exact_search(self, snapshot: LocalSnapshot, queries: np.ndarray, top_k: int,
+                      row_mask: Optional[np.ndarray]):
+        best_rows = [np.zeros(0, dtype=np.int64) for _ in range(len(queries))]
+        best_scores = [np.zeros(0, dtype=np.float32) for _ in range(len(queries))]
+
+        for start in range(0, len(snapshot.ids), self.BLOCK_ROWS):
+            block = np.asarray(snapshot.vectors[start:start + self.BLOCK_ROWS])
+            block_scores = block @ queries.T
+            if row_mask is not None:
+                block_scores[~row_mask[start:start + len(block)]] = -np.inf
+
+            for q in range(len(queries)):
+                top = self._top_k(block_scores[:, q], top_k)
+                rows = np.concatenate([best_rows[q], top + start])
+                scores = np.concatenate([best_scores[q], block_scores[top, q]])
+                keep = self._top_k(scores, top_k)
+                best_rows[q], best_scores[q] = rows[keep], scores[keep]
+
+        return best_rows, best_scores
+
+    def _ivf_search(self, snapshot: LocalSnapshot, queries: np.ndarray, top_k: int,
+                    row_mask: Optional[np.ndarray]):
+        probes = np.argsort(-(queries @ snapshot.ivf_centroids.T), axis=1)[:, :self.nprobe]
+
+        best_rows, best_scores = [], []
+        for q, lists in enumerate(probes):
+            rows = np.concatenate([
+                np.arange(snapshot.ivf_offsets[l], snapshot.ivf_offsets[l + 1]) for l in lists
+            ])
+            if row_mask is not None:
+                rows = rows[row_mask[rows]]
+            scores = np.asarray(snapshot.vectors[rows]) @ queries[q]
+            top = self._top_k(scores, top_k)
+            best_rows.append(rows[top])
+            best_scores.append(scores[top])
+
+        return best_rows, best_scores
+
+    def query_batch(self, vectors, top_k, allowed_sources=None, include_values=False):
+        snapshot = self.snapshot()
+        if snapshot is None or not snapshot.ids:
+            return [[] for _ in vectors]
+
+        queries = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+        row_mask = snapshot.row_mask(allowed_sources)
+
+        use_ivf = snapshot.ivf_centroids is not None and self.nprobe < len(snapshot.ivf_centroids)
+        search = self._ivf_search if use_ivf else self._exact_search
+        all_rows, all_scores = search(snapshot, queries, top_k, row_mask)
+
+        results = []
+        for rows, scores in zip(all_rows, all_scores):
+            results.append([
+                {
+                    "id": snapshot.ids[row],
+                    "score": float(score),
+                    "metadata": snapshot.metadata[row],
+                    "values": np.asarray(snapshot.vectors[row]) if include_values else None,
+                }
+                for row, score in zip(rows, scores) if np.isfinite(score)
+            ])
+        return results
+
+    def _build_ivf(self, vectors: np.ndarray, iterations: int = 10):
+        """Spherical k-means; returns (row order grouped by list, centroids, list offsets)."""
+        num_lists = min(self.ivf_lists, len(vectors))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.concatenate([
+                np.argmax(vectors[start:start + self.BLOCK_ROWS] @ centroids.T, axis=1)
+                for start in range(0, len(vectors), self.BLOCK_ROWS)
+            ])
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=num_lists)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            non_empty = counts > 0
+            sums = np.add.reduceat(vectors[order], starts[non_empty], axis=0)
+            centroids[non_empty] = self._normalize(sums)
+
+        offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return order, centroids.astype(np.float32), offsets
+
+    def replace_all(self, records, version=None):
+        dimension = record_dimension(records)
+        os.makedirs(self.directory, exist_ok=True)
+        version = version or uuid.uuid4().hex[:12]
+
+        vectors = self._normalize(np.asarray([record["values"] for record in records], dtype=np.float32))
+        ids = [record["id"] for record in records]
+        metadata = [record["metadata"] for record in records]
+
+        columns = {}
+        if self.ivf_lists > 0 and len(records) > 0:
+            order, columns["ivf_centroids"], columns["ivf_offsets"] = self._build_ivf(vectors)
+            # Rows of one IVF list are stored contiguously so a probe reads one slice
+            vectors = vectors[order]
+            ids = [ids[row] for row in order]
+            metadata = [metadata[row] for row in order]
+
+        sources = sorted({meta.get("source", "") for meta in metadata})
+        source_lookup = {source: code for code, source in enumerate(sources)}
+        columns["source_codes"] = np.array([source_lookup[meta.get("source", "")] for meta in metadata], dtype=np.int32)
+
+        # Unique file names: re-ingesting the same version must not truncate files readers have mapped
+        file_tag = f"{version}-{uuid.uuid4().hex[:8]}"
+        manifest = {
+            "version": version,
+            "dimension": dimension,
+            "count": len(ids),
+            "vectors_file": f"vectors-{file_tag}.npy",
+            "columns_file": f"columns-{file_tag}.npz",
+            "records_file": f"records-{file_tag}.json",
+            "ivf_lists": len(columns["ivf_centroids"]) if "ivf_centroids" in columns else 0,
+            "created_at": time.time(),
+        }
+
+        np.save(os.path.join(self.directory, manifest["vectors_file"]), vectors)
+        np.savez(os.path.join(self.directory, manifest["columns_file"]), **columns)
+        with open(os.path.join(self.directory, manifest["records_file"]), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadata": metadata, "sources": sources}, f)
+
+        # Swapping the manifest last publishes the new version atomically to readers
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+        current_files = {manifest["vectors_file"], manifest["columns_file"], manifest["records_file"]}
+        for name in os.listdir(self.directory):
+            if name.split("-")[0] in ("vectors", "columns", "records") and name not in current_files:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # Still mapped by a reader on platforms that lock open files
+
+        logger.info("Wrote %d vectors to local store %s (version %s)", len(ids), self.directory, version)
+
+
+_vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Process-wide vector store for the backend selected by VECTOR_STORE_BACKEND."""
+    global _vector_store
+
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                if VECTOR_STORE_BACKEND == "local":
+                    _vector_store = LocalVectorStore()
+                else:
+                    _vector_store = PineconeVectorStore()
+    return _vector_store